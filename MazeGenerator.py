@@ -1,99 +1,424 @@
+"""Seeded instance generator for all eight problem formats.
+
+Instances are built directly in a padded Grid buffer (see grid.py). Random
+terrain is one rng.randbytes() call per row translated through a 256-entry
+symbol table, and the problem 1 maze is a binary-tree maze assembled with
+slice assignments, so construction never loops over cells in Python. Every
+builder carves a guaranteed route (the "spine") before placing hazards,
+solvability is confirmed with a bit-parallel flood fill (bitrows.py), and
+rows are streamed straight from the buffer to the output file.
+
+Usage:
+    python MazeGenerator.py                          # problem 1, 100 x 100, to stdout
+    python MazeGenerator.py 5 --size 10000 --seed 7 -o cave.txt
+    python MazeGenerator.py 3 --size 500 --guards 40 -o museum.txt
+"""
+
+import argparse
 import random
-from collections import deque
+import sys
+
+from bitrows import any_hit, flood, positions_to_rows, row_masks
+from exclusion import dilate
+from grid import Grid, passable_table
 
 SIZE = 100
+FIRE_RADIUS = 2
+
+# Feature counts for a 100 x 100 map; scaled with the area for other sizes.
 FIRE_COUNT = 6
 EXTRA_OPENINGS = 200
+GUARD_COUNT = 12
+SHELTER_COUNT = 4
 
-def make_empty_grid(n):
-    return [['#'] * n for _ in range(n)]
-
-def neighbors(r, c, n):
-    for dr, dc in [(2,0),(-2,0),(0,2),(0,-2)]:
-        nr, nc = r + dr, c + dc
-        if 1 <= nr < n-1 and 1 <= nc < n-1:
-            yield nr, nc
-
-def generate_maze(n):
-    grid = make_empty_grid(n)
-    stack = [(1,1)]
-    grid[1][1] = '.'
-
-    while stack:
-        r, c = stack[-1]
-        unvisited = [(nr, nc) for nr, nc in neighbors(r,c,n) if grid[nr][nc] == '#']
-        if not unvisited:
-            stack.pop()
-            continue
-        nr, nc = random.choice(unvisited)
-        grid[(r+nr)//2][(c+nc)//2] = '.'
-        grid[nr][nc] = '.'
-        stack.append((nr,nc))
+# Problem 3 patrols are rectangles with h + w drawn from these values, so the
+# cycle lengths 2 * (h + w) all divide 48 and the combined guard period stays small.
+HALF_PERIMETERS = (2, 3, 4, 6, 8, 12)
+
+BATTERY = 5
+UNSTABLE_COUNT = 8
+
+# Random terrain for each problem as {symbol: weight}.
+TERRAIN = {
+    2: {'.': 60, '*': 15, '~': 15, '#': 10},
+    3: {'.': 88, '#': 12},
+    4: {'0': 9, '1': 9, '2': 9, '3': 9, '4': 9, '5': 9, '6': 9, '7': 9, '8': 9, '9': 9, '#': 6},
+    5: {'.': 64, '#': 12, '>': 6, '<': 6, '^': 6, 'v': 6},
+    6: {'.': 50, 'C': 10, 'M': 15, 'P': 15, '#': 10},
+    7: {'.': 62, 'F': 28, '#': 10},
+    8: {'~': 60, '.': 35, '#': 5},
+}
+
+# Solvability check per problem: (passable symbols, 8-connected, goal symbol).
+# For problems 5 and 8 only still water / stable stones count, which makes
+# the check sufficient: such a route needs no battery and no unstable stone.
+# For problem 3 it ignores the guards; it is sufficient only because
+# build_problem3 keeps every patrol off the carved spine, which the thief
+# can then walk without meeting a guard.
+ROUTES = {
+    1: ('.SE', False, 'E'),
+    2: ('.*~SCD', True, 'C'),
+    3: ('.ST', False, 'T'),
+    4: ('0123456789SH', True, 'H'),
+    5: ('.SU', False, 'U'),
+    6: ('.CMPSO', True, 'O'),
+    7: ('.FSH', False, 'H'),
+    8: ('.SE', True, 'E'),
+}
+
+
+def scaled(count, size):
+    """Scale a per-100x100 feature count to a size x size map."""
+    return max(1, round(count * size * size / (SIZE * SIZE)))
+
+
+def symbol_table(weights):
+    """Map uniform random bytes to symbols in proportion to their weights.
+
+    Returns:
+        256-byte translate table
+    """
+    total = sum(weights.values())
+    table = bytearray()
+    acc = 0
+    for ch, weight in weights.items():
+        acc += weight
+        table += ch.encode() * (round(256 * acc / total) - len(table))
+    return bytes(table)
+
+
+def blank_grid(rows, cols, ch='#'):
+    """A Grid with every cell set to `ch`."""
+    grid = Grid(rows, cols, bytearray((rows + 2) * (cols + 2)))
+    fill = ch.encode() * cols
+    for r in range(rows):
+        start = grid.index(r, 0)
+        grid.cells[start:start + cols] = fill
+    return grid
+
+
+def random_grid(rng, rows, cols, weights):
+    """A Grid filled with random symbols drawn by weight, one row at a time."""
+    table = symbol_table(weights)
+    grid = Grid(rows, cols, bytearray((rows + 2) * (cols + 2)))
+    for r in range(rows):
+        start = grid.index(r, 0)
+        grid.cells[start:start + cols] = rng.randbytes(cols).translate(table)
+    return grid
+
+
+def frame(grid, ch='#'):
+    """Surround the map with a one-cell wall on its outermost rows and columns."""
+    cells, rows, cols, stride = grid.cells, grid.rows, grid.cols, grid.stride
+    for r in (0, rows - 1):
+        start = grid.index(r, 0)
+        cells[start:start + cols] = ch.encode() * cols
+    for c in (0, cols - 1):
+        cells[grid.index(0, c):grid.index(rows - 1, c) + 1:stride] = ch.encode() * rows
+
+
+def carve_spine(grid, rng, start, goal, ch='.'):
+    """Carve a random monotone staircase of `ch` from start to goal.
+
+    Returns:
+        list of (row, col) positions on the spine
+    """
+    (r, c), (gr, gc) = start, goal
+    steps = [(1 if gr > r else -1, 0)] * abs(gr - r) + [(0, 1 if gc > c else -1)] * abs(gc - c)
+    rng.shuffle(steps)
+    path = [start]
+    for dr, dc in steps:
+        r += dr
+        c += dc
+        path.append((r, c))
+    for r, c in path:
+        grid.set(r, c, ch)
+    return path
+
+
+def random_cells(rng, count, low, high, avoid=()):
+    """Draw `count` distinct (row, col) cells with coordinates in [low, high)."""
+    avoid = set(avoid)
+    cells = set()
+    limit = (high - low) ** 2 - len(avoid)
+    while len(cells) < min(count, limit):
+        cell = (rng.randrange(low, high), rng.randrange(low, high))
+        if cell not in avoid:
+            cells.add(cell)
+    return sorted(cells)
+
+
+def generate_maze(rng, n, openings=None):
+    """Binary-tree maze on an n x n board, plus random extra openings.
 
-    # add loops
-    for _ in range(EXTRA_OPENINGS):
-        r = random.randrange(1,n-1)
-        c = random.randrange(1,n-1)
-        grid[r][c] = '.'
+    Maze cells sit at odd coordinates; each one links either east or north
+    (the top row always east, the last column always north), which yields a
+    perfect maze. Rows are assembled with slice assignments from one random
+    byte per cell. If n is even the last row and column stay solid.
+    """
+    grid = blank_grid(n, n)
+    cells = grid.cells
+    m = n if n % 2 else n - 1
+    k = (m - 1) // 2
+    east = bytes(b'.'[0] if b < 128 else b'#'[0] for b in range(256))
+    north = bytes(b'#'[0] if b < 128 else b'.'[0] for b in range(256))
+    for j in range(k):
+        r = 2 * j + 1
+        row = bytearray(b'#' * n)
+        row[1:m - 1:2] = b'.' * k
+        if j == 0:
+            row[2:m - 2:2] = b'.' * (k - 1)
+        else:
+            choice = rng.randbytes(k)
+            row[2:m - 2:2] = choice.translate(east)[:k - 1]
+            links = bytearray(choice.translate(north))
+            links[-1] = b'.'[0]
+            above = grid.index(r - 1, 0)
+            cells[above + 1:above + m - 1:2] = links
+        start = grid.index(r, 0)
+        cells[start:start + n] = row
 
+    if openings is None:
+        openings = scaled(EXTRA_OPENINGS, n)
+    for r in range(openings):
+        grid.set(rng.randrange(1, n - 1), rng.randrange(1, n - 1), '.')
     return grid
 
-def manhattan(a,b):
-    return abs(a[0]-b[0]) + abs(a[1]-b[1])
-
-def fire_exclusion(fires):
-    zone = set()
-    for fr,fc in fires:
-        for r in range(SIZE):
-            for c in range(SIZE):
-                if manhattan((r,c),(fr,fc)) <= 2:
-                    zone.add((r,c))
-    return zone
-
-def bfs(grid, start, exits):
-    q = deque([(start,0)])
-    visited = {start}
-    while q:
-        (r,c),d = q.popleft()
-        if (r,c) in exits:
-            return True
-        for dr,dc in [(1,0),(-1,0),(0,1),(0,-1)]:
-            nr,nc = r+dr, c+dc
-            if 0<=nr<SIZE and 0<=nc<SIZE:
-                if grid[nr][nc] != '#' and (nr,nc) not in visited:
-                    visited.add((nr,nc))
-                    q.append(((nr,nc),d+1))
-    return False
-
-def build():
+
+def is_solvable(problem, grid, extras=None):
+    """Fast solvability check using a bit-parallel flood fill.
+
+    See ROUTES for what is checked per problem. Problem 1 also removes the
+    fire exclusion zones; problem 2 needs a 'D' and the 'C' in the start's
+    component.
+    """
+    chars, diagonal, goal = ROUTES[problem]
+    masks = row_masks(grid, passable_table(chars))
+    if problem == 1:
+        radius = (extras or {}).get('radius', FIRE_RADIUS)
+        zone = dilate(row_masks(grid, passable_table('x')), radius, grid.cols)
+        masks = [m & ~z for m, z in zip(masks, zone)]
+    reached = flood(masks, positions_to_rows(grid.find('S'), grid.rows), grid.cols, diagonal)
+    if problem == 2 and not any_hit(reached, grid.find('D')):
+        return False
+    return any_hit(reached, grid.find(goal))
+
+
+def build_problem1(rng, size, fires=None, radius=FIRE_RADIUS):
+    grid = generate_maze(rng, size)
+    m = size if size % 2 else size - 1
+    start = (1, 1)
+    exits = [(m - 2, m - 2), (1, m - 2), (m - 2, 1)]
+    grid.set(*start, 'S')
+    for r, c in exits:
+        grid.set(r, c, 'E')
+
+    # Fires are dropped half at a time until the exits are reachable again;
+    # with no fires the perfect maze always connects S to every exit.
+    margin = min(5, m // 4)
+    fires = random_cells(rng, scaled(FIRE_COUNT, size) if fires is None else fires,
+                         margin, max(margin + 1, m - margin), [start] + exits)
+    original = {(r, c): grid.char(grid.index(r, c)) for r, c in fires}
+    extras = {'radius': radius}
     while True:
-        grid = generate_maze(SIZE)
+        for r, c in fires:
+            grid.set(r, c, 'x')
+        if not fires or is_solvable(1, grid, extras):
+            return grid, extras
+        for r, c in fires[len(fires) // 2:]:
+            grid.set(r, c, original[(r, c)])
+        fires = fires[:len(fires) // 2]
+
+
+def build_problem2(rng, size, dirty=None):
+    grid = random_grid(rng, size, size, TERRAIN[2])
+    frame(grid)
+    start, charger = (1, 1), (size - 2, size - 2)
+    spine = carve_spine(grid, rng, start, charger)
+    for r, c in random_cells(rng, scaled(3, size) if dirty is None else dirty, 1, size - 1):
+        grid.set(r, c, 'D')
+    grid.set(*spine[len(spine) // 2], 'D')
+    grid.set(*start, 'S')
+    grid.set(*charger, 'C')
+    return grid, {}
+
+
+def build_problem3(rng, size, guards=None):
+    grid = random_grid(rng, size, size, TERRAIN[3])
+    frame(grid)
+    start, treasure = (1, 1), (size - 2, size - 2)
+    spine = set(carve_spine(grid, rng, start, treasure))
+
+    # Rectangular patrols; their perimeter is carved open so every move is
+    # legal, and it never touches the spine, so walking the spine is safe.
+    patrols = []
+    for k in range(scaled(GUARD_COUNT, size) if guards is None else guards):
+        for _ in range(100):
+            half = rng.choice(HALF_PERIMETERS)
+            h = rng.randint(1, half - 1)
+            w = half - h
+            if h + 2 >= size or w + 2 >= size:
+                break
+            r, c = rng.randrange(1, size - 1 - h), rng.randrange(1, size - 1 - w)
+            perimeter = [(r + dr, c + dc) for dr in (0, h) for dc in range(w + 1)]
+            perimeter += [(r + dr, c + dc) for dr in range(h + 1) for dc in (0, w)]
+            if spine.isdisjoint(perimeter):
+                break
+        else:
+            continue
+        if h + 2 >= size or w + 2 >= size:
+            break
+        for dc in range(w + 1):
+            grid.set(r, c + dc, '.')
+            grid.set(r + h, c + dc, '.')
+        for dr in range(h + 1):
+            grid.set(r + dr, c, '.')
+            grid.set(r + dr, c + w, '.')
+        patrols.append((f'G{k + 1}', r, c, 'R' * w + 'D' * h + 'L' * w + 'U' * h))
+    grid.set(*start, 'S')
+    grid.set(*treasure, 'T')
+    return grid, {'guards': patrols}
+
+
+def build_problem4(rng, size):
+    grid = random_grid(rng, size, size, TERRAIN[4])
+    start, hiker = (0, 0), (size - 1, size - 1)
+    carve_spine(grid, rng, start, hiker, '1')
+    grid.set(*start, 'S')
+    grid.set(*hiker, 'H')
+    return grid, {}
+
+
+def build_problem5(rng, size, battery=BATTERY):
+    grid = random_grid(rng, size, size, TERRAIN[5])
+    frame(grid)
+    start, surface = (1, 1), (size - 2, size - 2)
+    carve_spine(grid, rng, start, surface)
+    grid.set(*start, 'S')
+    grid.set(*surface, 'U')
+    return grid, {'battery': battery}
+
+
+def build_problem6(rng, size):
+    grid = random_grid(rng, size, size, TERRAIN[6])
+    frame(grid)
+    start, output = (1, 1), (size - 2, size - 2)
+    carve_spine(grid, rng, start, output)
+    grid.set(*start, 'S')
+    grid.set(*output, 'O')
+    return grid, {}
+
+
+def build_problem7(rng, size, shelters=None):
+    grid = random_grid(rng, size, size, TERRAIN[7])
+    frame(grid)
+    start, shelter = (1, 1), (size - 2, size - 2)
+    carve_spine(grid, rng, start, shelter)
+    count = scaled(SHELTER_COUNT, size) if shelters is None else shelters
+    for r, c in random_cells(rng, count - 1, 1, size - 1, [start]):
+        grid.set(r, c, 'H')
+    grid.set(*start, 'S')
+    grid.set(*shelter, 'H')
+    return grid, {}
+
+
+def build_problem8(rng, size, unstable=UNSTABLE_COUNT):
+    grid = random_grid(rng, size, size, TERRAIN[8])
+    cells = grid.cells
+    for r in range(size):
+        start = grid.index(r, 0)
+        cells[start:start + 3] = b'SSS'
+        cells[start + size - 3:start + size] = b'EEE'
+    spine = carve_spine(grid, rng, (rng.randrange(size), 3), (rng.randrange(size), size - 4))
+    for r, c in random_cells(rng, unstable, 0, size, spine):
+        if 3 <= c < size - 3:
+            grid.set(r, c, 's')
+    return grid, {}
+
+
+BUILDERS = {
+    1: build_problem1,
+    2: build_problem2,
+    3: build_problem3,
+    4: build_problem4,
+    5: build_problem5,
+    6: build_problem6,
+    7: build_problem7,
+    8: build_problem8,
+}
+
+
+# The one count each builder accepts as an option (problems 4 and 6 have none).
+OPTIONS = {1: 'fires', 2: 'dirty', 3: 'guards', 5: 'battery', 7: 'shelters', 8: 'unstable'}
+
+
+def generate(problem, size=SIZE, seed=None, **options):
+    """Generate a solvable instance.
+
+    Args:
+        problem: problem number 1-8
+        size: side length of the square map (at least 5)
+        seed: random seed; the same (problem, size, seed, options) always
+              yields the same instance
+        options: builder-specific counts, e.g. fires=, dirty=, guards=,
+                 battery=, shelters=, unstable=
+
+    Returns:
+        (grid, extras): the Grid and a dict with the non-grid sections,
+        'battery' for problem 5 and 'guards' for problem 3 as a list of
+        (id, row, col, moves) tuples
+    """
+    if size < 5:
+        raise ValueError('size must be at least 5')
+    rng = random.Random(seed)
+    grid, extras = BUILDERS[problem](rng, size, **options)
+    if not is_solvable(problem, grid, extras):
+        raise RuntimeError(f'generated problem {problem} instance is not solvable')
+    return grid, extras
 
-        start = (1,1)
-        grid[start[0]][start[1]] = 'S'
 
-        exits = [(SIZE-2, SIZE-2), (1,SIZE-2), (SIZE-2,1)]
-        for r,c in exits:
-            grid[r][c] = 'E'
+def write_instance(grid, extras, f):
+    """Stream an instance to a binary file object in the problemN text format."""
+    if 'battery' in extras:
+        f.write(b'%d\n' % extras['battery'])
+    cells, cols = grid.cells, grid.cols
+    for r in range(grid.rows):
+        start = grid.index(r, 0)
+        f.write(cells[start:start + cols])
+        f.write(b'\n')
+    if 'guards' in extras:
+        f.write(b'GUARDS\n')
+        for guard_id, r, c, moves in extras['guards']:
+            f.write(f"{guard_id} {r} {c} {','.join(moves)}\n".encode())
 
-        fires = []
-        for _ in range(FIRE_COUNT):
-            r = random.randrange(5,SIZE-5)
-            c = random.randrange(5,SIZE-5)
-            fires.append((r,c))
-            grid[r][c] = 'x'
 
-        exclusion = fire_exclusion(fires)
+def main():
+    parser = argparse.ArgumentParser(description='Generate solvable problemN instances.')
+    parser.add_argument('problem', type=int, nargs='?', default=1, choices=sorted(BUILDERS))
+    parser.add_argument('--size', type=int, default=SIZE, help=f'side length (default {SIZE})')
+    parser.add_argument('--seed', type=int, help='random seed (default: random)')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    parser.add_argument('--fires', type=int, help='problem 1: number of fires')
+    parser.add_argument('--dirty', type=int, help='problem 2: number of extra dirty zones')
+    parser.add_argument('--guards', type=int, help='problem 3: number of guards')
+    parser.add_argument('--battery', type=int, help='problem 5: battery limit')
+    parser.add_argument('--shelters', type=int, help='problem 7: number of shelters')
+    parser.add_argument('--unstable', type=int, help='problem 8: number of unstable stones')
+    args = parser.parse_args()
 
-        safe_grid = [row[:] for row in grid]
-        for r,c in exclusion:
-            if safe_grid[r][c] == '.':
-                safe_grid[r][c] = '#'
+    options = {name: getattr(args, name) for name in OPTIONS.values()
+               if getattr(args, name) is not None}
+    unsupported = set(options) - {OPTIONS.get(args.problem)}
+    if unsupported:
+        parser.error(f'--{", --".join(sorted(unsupported))} does not apply to problem {args.problem}')
+    grid, extras = generate(args.problem, args.size, args.seed, **options)
 
-        if bfs(safe_grid, start, set(exits)):
-            return grid
+    if args.output:
+        with open(args.output, 'wb') as f:
+            write_instance(grid, extras, f)
+    else:
+        write_instance(grid, extras, sys.stdout.buffer)
 
-maze = build()
 
-for row in maze:
-    print("".join(row))
+if __name__ == '__main__':
+    main()
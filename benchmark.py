@@ -0,0 +1,233 @@
+"""Benchmark runner for all eight solvers.
+
+Runs every problemN solver on the small/medium/large data files and on
+generated square instances, recording wall time, nodes expanded, peak
+frontier size and peak memory (tracemalloc) for each run. Results are
+written as JSON; --compare checks them against a saved baseline and flags
+regressions.
+
+Usage:
+    python benchmark.py -o baseline.json
+    python benchmark.py --problems 2 6 --sizes large --generated 500 1000
+    python benchmark.py --compare baseline.json --threshold 1.25
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import MazeGenerator
+import problem1
+import problem2
+import problem3
+import problem4
+import problem5
+import problem6
+import problem7
+import problem8
+
+DATA_SIZES = ['small', 'medium', 'large']
+GENERATED_SIZES = [500, 1000, 5000]
+# Default generated sizes for problems that would not fit the 5000 x 5000
+# run: problem 3 explores (cell, time) states, about 130 s at 1000 x 1000;
+# problem 5 keeps (cell, battery) states, about 1 GB at 1000 x 1000 and
+# over 20 GB at 5000 x 5000. (At 5000 x 5000 the others stay below 1 GB;
+# problem 2 is the slowest at about 3.5 minutes.)
+PROBLEM_GENERATED_SIZES = {3: [500, 1000], 5: [500, 1000]}
+METRICS = ['wall_time', 'expanded', 'peak_memory']
+# Timing differences below this many seconds are treated as noise.
+TIME_FLOOR = 0.005
+
+
+def _summary_cost(result):
+    return None if result is None else result[0]
+
+
+def _summary_battery(result):
+    return None if result is None else [len(result[0]), result[1]]
+
+
+def _load_plain(module):
+    return lambda filename: (module.load_grid(filename),)
+
+
+PROBLEMS = {
+    1: (_load_plain(problem1), problem1.find_escape_path, _summary_cost),
+    2: (_load_plain(problem2), problem2.find_cheapest_path, _summary_cost),
+    3: (problem3.load_grid_and_guards, problem3.find_safe_path, _summary_cost),
+    4: (_load_plain(problem4), problem4.find_rescue_path, _summary_cost),
+    5: (problem5.load_grid_and_battery, problem5.find_escape_path, _summary_battery),
+    6: (_load_plain(problem6), problem6.find_lowest_power_path, _summary_cost),
+    7: (_load_plain(problem7), problem7.find_nearest_shelter, _summary_cost),
+    8: (_load_plain(problem8), problem8.find_crossing_path, _summary_cost),
+}
+
+
+def generate_instance(problem, size, seed):
+    """Build a random size x size instance in memory (see MazeGenerator.generate).
+
+    Returns:
+        tuple of solver arguments, as returned by the problem's loader
+    """
+    grid, extras = MazeGenerator.generate(problem, size, seed)
+    if problem == 3:
+        guards = [problem3.build_guard(guard_id, (r, c), moves)
+                  for guard_id, r, c, moves in extras['guards']]
+        return grid, guards
+    if problem == 5:
+        return grid, extras['battery']
+    return (grid,)
+
+
+def measure(solve, args, memory=True, repeat=1):
+    """Run one solver call and collect its metrics.
+
+    Wall time is the best of `repeat` untraced runs; peak memory comes from a
+    separate run under tracemalloc so tracing overhead does not skew timing.
+
+    Returns:
+        (result, metrics dict)
+    """
+    best = None
+    for _ in range(repeat):
+        stats = {}
+        start = time.perf_counter()
+        result = solve(*args, stats=stats)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    metrics = {
+        'wall_time': best,
+        'expanded': stats.get('expanded'),
+        'peak_frontier': stats.get('peak_frontier'),
+        'peak_memory': None,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            solve(*args)
+            metrics['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, metrics
+
+
+def run(problems, sizes, generated=None, memory=True, repeat=1, seed=0, log=sys.stderr):
+    """Benchmark the selected problems.
+
+    `generated` lists the generated instance sizes; None runs each problem's
+    defaults (PROBLEM_GENERATED_SIZES, else GENERATED_SIZES).
+
+    Returns:
+        list of run records (dicts), one per (problem, instance)
+    """
+    records = []
+    for n in problems:
+        loader, solve, summarize = PROBLEMS[n]
+        instances = [(f'problem{n}_{size}.txt', lambda f=f'problem{n}_{size}.txt': loader(f))
+                     for size in sizes]
+        if generated is None:
+            generated_sizes = PROBLEM_GENERATED_SIZES.get(n, GENERATED_SIZES)
+        else:
+            generated_sizes = generated
+        instances += [(f'generated_{size}', lambda size=size: generate_instance(n, size, seed))
+                      for size in generated_sizes]
+        for name, build in instances:
+            args = build()
+            grid = args[0]
+            result, metrics = measure(solve, args, memory, repeat)
+            record = {
+                'problem': n,
+                'instance': name,
+                'rows': grid.rows,
+                'cols': grid.cols,
+                'result': summarize(result),
+            }
+            record.update(metrics)
+            records.append(record)
+            print(f"problem{n} {name:<22} {metrics['wall_time'] * 1000:10.2f} ms  "
+                  f"expanded {metrics['expanded']}  frontier {metrics['peak_frontier']}  "
+                  f"memory {metrics['peak_memory']}", file=log)
+    return records
+
+
+def compare(records, baseline, threshold):
+    """Compare run records against baseline records.
+
+    A metric regresses when it exceeds `threshold` times its baseline value
+    (wall times below TIME_FLOOR are ignored as noise); a changed result is
+    always flagged.
+
+    Returns:
+        list of human-readable regression descriptions
+    """
+    previous = {(b['problem'], b['instance']): b for b in baseline}
+    regressions = []
+    for record in records:
+        key = (record['problem'], record['instance'])
+        old = previous.get(key)
+        if old is None:
+            continue
+        label = f"problem{key[0]} {key[1]}"
+        if record['result'] != old['result']:
+            regressions.append(f"{label}: result changed {old['result']} -> {record['result']}")
+        for metric in METRICS:
+            before, after = old.get(metric), record.get(metric)
+            if before is None or after is None:
+                continue
+            if metric == 'wall_time' and after < TIME_FLOOR:
+                continue
+            if after > before * threshold:
+                regressions.append(f"{label}: {metric} {before} -> {after} "
+                                   f"({after / before if before else float('inf'):.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the problemN solvers.')
+    parser.add_argument('--problems', type=int, nargs='+', default=sorted(PROBLEMS),
+                        choices=sorted(PROBLEMS), metavar='N')
+    parser.add_argument('--sizes', nargs='*', default=DATA_SIZES, choices=DATA_SIZES,
+                        help='data file sizes to run')
+    parser.add_argument('--generated', type=int, nargs='*', metavar='SIZE',
+                        help='side lengths of generated instances (default: 500 1000 5000, '
+                             'problems 3 and 5 stop at 1000)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for generated instances')
+    parser.add_argument('--repeat', type=int, default=1, help='timed runs per instance (best is kept)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('-o', '--output', help='write JSON results here (default: stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='baseline JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='allowed ratio over baseline before flagging (default 1.2)')
+    args = parser.parse_args()
+
+    records = run(args.problems, args.sizes, args.generated,
+                  memory=not args.no_memory, repeat=args.repeat, seed=args.seed)
+    report = {
+        'python': platform.python_version(),
+        'seed': args.seed,
+        'runs': records,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['runs']
+        regressions = compare(records, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print('No regressions against baseline.', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
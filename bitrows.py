@@ -0,0 +1,105 @@
+"""Row-bitset views of a grid and bit-parallel flood fill.
+
+Each map row is one Python integer with bit c set for column c (see also
+exclusion.py). Whole rows are combined with shifts, ANDs and ORs, so a
+connectivity check on a 10k x 10k map costs a few big-integer operations
+per row instead of one Python step per cell.
+"""
+
+
+def row_masks(grid, table):
+    """Per-row bitsets of the cells whose code is marked in `table`.
+
+    Args:
+        grid: Grid
+        table: 256-entry lookup (e.g. from grid.passable_table)
+
+    Returns:
+        list of ints, bit c of entry r set iff table[code of (r, c)] is truthy
+    """
+    translate = bytes(ord('1') if table[code] else ord('0') for code in range(256))
+    cells = grid.cells
+    cols = grid.cols
+    masks = []
+    for r in range(grid.rows):
+        start = grid.index(r, 0)
+        row = cells[start:start + cols].translate(translate)
+        masks.append(int(row[::-1], 2) if cols else 0)
+    return masks
+
+
+def fill_runs(seeds, mask, width):
+    """Grow seed bits to the whole horizontal runs of `mask` that contain them.
+
+    Towards higher bits the carry of `mask + seeds` runs each seed to the top
+    of its run in one addition; towards bit 0 a Kogge-Stone occluded fill
+    covers runs of any length in log2(width) steps.
+    """
+    seeds &= mask
+    gen = (((mask + seeds) ^ mask) & mask) | seeds
+    pro = mask
+    k = 1
+    while k < width:
+        gen |= pro & (gen >> k)
+        pro &= pro >> k
+        k <<= 1
+    return gen
+
+
+def flood(masks, seeds, width, diagonal=False):
+    """Bit-parallel flood fill.
+
+    Args:
+        masks: per-row bitsets of passable cells
+        seeds: per-row bitsets of starting cells (outside `masks` is ignored)
+        width: number of columns
+        diagonal: use 8-connectivity instead of 4-connectivity
+
+    Returns:
+        per-row bitsets of every passable cell connected to a seed
+    """
+    rows = len(masks)
+    full = (1 << width) - 1
+    reached = [fill_runs(s, m, width) if s else 0 for s, m in zip(seeds, masks)]
+    sweeps = (range(1, rows), 1), (range(rows - 2, -1, -1), -1)
+    changed = True
+    while changed:
+        changed = False
+        for order, step in sweeps:
+            for r in order:
+                near = reached[r - step]
+                if not near:
+                    continue
+                if diagonal:
+                    near = (near | (near << 1) | (near >> 1)) & full
+                grow = near & masks[r] & ~reached[r]
+                if grow:
+                    reached[r] = fill_runs(reached[r] | grow, masks[r], width)
+                    changed = True
+    return reached
+
+
+def rows_to_mask(grid, bits):
+    """Expand per-row bitsets into a flat byte mask aligned with the grid."""
+    table = bytearray(256)
+    table[ord('1')] = 1
+    mask = bytearray(grid.size)
+    cols = grid.cols
+    for r, row in enumerate(bits):
+        if row:
+            start = grid.index(r, 0)
+            mask[start:start + cols] = format(row, '0%db' % cols)[::-1].encode().translate(table)
+    return mask
+
+
+def positions_to_rows(positions, rows):
+    """Return per-row bitsets for a list of (row, col) positions."""
+    bits = [0] * rows
+    for r, c in positions:
+        bits[r] |= 1 << c
+    return bits
+
+
+def any_hit(bits, targets):
+    """True if any (row, col) in `targets` is set in the per-row bitsets."""
+    return any(bits[r] >> c & 1 for r, c in targets)
@@ -0,0 +1,84 @@
+"""Hazard exclusion masks built by bit-parallel diamond dilation.
+
+Each map row is held as one Python integer with bit c set for column c. A
+Manhattan ball of radius R is the union, over row offsets dr in [-R, R], of
+the hazard row dilated horizontally by R - |dr|; horizontal dilation is a
+shift-and-OR on the whole row at once. The cost is O(R) whole-row integer
+operations per row that contains a hazard, instead of O(R^2) cell visits
+per hazard (or a full-board scan per hazard).
+"""
+
+from bitrows import positions_to_rows, row_masks, rows_to_mask
+from grid import passable_table
+
+
+def hazard_rows(grid, ch='x'):
+    """Return one bitset per row marking the cells that hold `ch`.
+
+    Args:
+        grid: Grid
+
+    Returns:
+        list of ints, bit c of entry r set iff cell (r, c) is `ch`
+    """
+    if ch in grid.symbols:
+        return positions_to_rows(grid.find(ch), grid.rows)
+    return row_masks(grid, passable_table(ch))
+
+
+def dilate(bits, radius, width):
+    """Dilate per-row bitsets by a Manhattan (diamond) kernel.
+
+    Args:
+        bits: list of per-row bitsets
+        radius: Manhattan radius of the kernel (>= 0)
+        width: number of columns; bits at or beyond it are cleared
+
+    Returns:
+        list of per-row bitsets, bit set iff within `radius` of a set bit
+    """
+    rows = len(bits)
+    full = (1 << width) - 1
+    out = [0] * rows
+    for r, row in enumerate(bits):
+        if not row:
+            continue
+        # spread[k] is the row dilated horizontally by k
+        spread = [row]
+        for _ in range(radius):
+            x = spread[-1]
+            spread.append((x | (x << 1) | (x >> 1)) & full)
+        for dr in range(-radius, radius + 1):
+            nr = r + dr
+            if 0 <= nr < rows:
+                out[nr] |= spread[radius - abs(dr)]
+    return out
+
+
+def exclusion_rows(grid, radius=2, ch='x'):
+    """Per-row bitsets of every cell within Manhattan `radius` of a `ch` cell."""
+    return dilate(hazard_rows(grid, ch), radius, grid.cols)
+
+
+def exclusion_mask(grid, radius=2, ch='x'):
+    """Boolean exclusion mask aligned with the grid's flat cell indices.
+
+    Args:
+        grid: Grid
+        radius: Manhattan radius around each hazard
+        ch: hazard character
+
+    Returns:
+        bytearray of length grid.size, 1 for excluded cells, 0 otherwise
+        (the padding border is left at 0; it is impassable anyway)
+    """
+    return rows_to_mask(grid, exclusion_rows(grid, radius, ch))
+
+
+def iter_bits(x):
+    """Yield the positions of the set bits of a non-negative integer."""
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
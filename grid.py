@@ -0,0 +1,185 @@
+"""Compact grid representation shared by all problem modules.
+
+The map is stored as one flat byte buffer of cell codes (the ASCII value of
+each character) instead of a list of lists of one-character strings. The
+buffer is padded with a one-cell border of BORDER codes, so neighbor
+expansion is a single integer addition with no bounds checks: BORDER is
+impassable in every passability and cost table.
+
+Cells are addressed by flat integer indices. Use index() and position() to
+convert between indices and the (row, col) tuples the solvers return.
+"""
+
+BORDER = 0
+
+DIRS4 = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+DIRS8 = [(dr, dc) for dr in [-1, 0, 1] for dc in [-1, 0, 1] if not (dr == 0 and dc == 0)]
+
+
+def passable_table(chars):
+    """Build a 256-entry lookup table marking the given characters passable.
+
+    Returns:
+        bytes where table[code] is 1 for passable cell codes, else 0
+    """
+    table = bytearray(256)
+    for ch in chars:
+        table[ord(ch)] = 1
+    return bytes(table)
+
+
+class Grid:
+    """A rectangular map backed by a padded, row-major byte buffer.
+
+    Attributes:
+        rows, cols: dimensions of the map (without padding)
+        stride: length of one padded row (cols + 2)
+        cells: bytes-like buffer of (rows + 2) * stride cell codes
+        offsets4: flat index deltas for DIRS4, in the same order
+        offsets8: flat index deltas for DIRS8, in the same order
+        symbols: optional {char: flat indices} index of special symbols
+                 (compiled maps carry one, see mapfile.py)
+    """
+
+    def __init__(self, rows, cols, cells, symbols=None):
+        self.rows = rows
+        self.cols = cols
+        self.stride = cols + 2
+        self.cells = cells
+        self.symbols = symbols or {}
+        self.offsets4 = self.offsets(DIRS4)
+        self.offsets8 = self.offsets(DIRS8)
+
+    @classmethod
+    def from_lines(cls, lines):
+        """Build a grid from an iterable of rows (strings or lists of characters).
+
+        Short rows are padded with BORDER, so ragged input stays rectangular.
+        """
+        lines = [''.join(line) for line in lines]
+        rows = len(lines)
+        cols = max((len(line) for line in lines), default=0)
+        stride = cols + 2
+        cells = bytearray(stride * (rows + 2))
+        for r, line in enumerate(lines):
+            start = (r + 1) * stride + 1
+            cells[start:start + len(line)] = line.encode('latin-1')
+        return cls(rows, cols, cells)
+
+    def offsets(self, dirs):
+        """Return the flat index deltas for a list of (dr, dc) directions."""
+        return tuple(dr * self.stride + dc for dr, dc in dirs)
+
+    @property
+    def size(self):
+        """Length of the padded cell buffer; valid bound for per-cell arrays."""
+        return self.stride * (self.rows + 2)
+
+    def index(self, r, c):
+        """Flat index of (row, col)."""
+        return (r + 1) * self.stride + c + 1
+
+    def position(self, i):
+        """(row, col) of a flat index."""
+        r, c = divmod(i, self.stride)
+        return (r - 1, c - 1)
+
+    def char(self, i):
+        """Character stored at a flat index."""
+        return chr(self.cells[i])
+
+    def set(self, r, c, ch):
+        """Store a character at (row, col); the buffer must be writable."""
+        self.cells[self.index(r, c)] = ord(ch)
+
+    def find(self, ch):
+        """Find all positions of a character (see find_indices).
+
+        Returns:
+            list of (row, col) tuples in row-major order
+        """
+        return [self.position(i) for i in self.find_indices(ch)]
+
+    def find_indices(self, ch):
+        """Find the flat indices of every cell holding a character.
+
+        Served from the symbol index when `ch` is indexed, otherwise found by
+        scanning the buffer natively.
+        """
+        if ch in self.symbols:
+            return list(self.symbols[ch])
+        needle = ch.encode('latin-1')
+        cells = self.cells
+        end = self.size
+        found = []
+        i = cells.find(needle, 0, end)
+        while i != -1:
+            found.append(i)
+            i = cells.find(needle, i + 1, end)
+        return found
+
+    def path(self, indices):
+        """Convert a sequence of flat indices to a list of (row, col) positions."""
+        return [self.position(i) for i in indices]
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, r):
+        if not 0 <= r < self.rows:
+            raise IndexError('grid row out of range')
+        start = (r + 1) * self.stride + 1
+        return bytes(self.cells[start:start + self.cols]).decode('latin-1')
+
+    def __iter__(self):
+        for r in range(self.rows):
+            yield self[r]
+
+    def to_lists(self):
+        """Return the map as the original list of lists of characters."""
+        return [list(row) for row in self]
+
+
+def as_grid(grid):
+    """Return `grid` as a Grid, converting a list of lists of characters."""
+    if isinstance(grid, Grid):
+        return grid
+    return Grid.from_lines(grid)
+
+
+def load(filename):
+    """Load a plain map file (one grid row per non-blank line) as a Grid.
+
+    Compiled binary maps (see mapfile.py) are memory-mapped instead.
+    """
+    from mapfile import is_map_file, open_map
+    if is_map_file(filename):
+        return open_map(filename)[0]
+    with open(filename, 'r') as f:
+        return Grid.from_lines(line.rstrip('\n') for line in f if line.strip())
+
+
+def trace_path(parent, goal):
+    """Follow a parent array back from `goal` to a root (a cell that is its own parent).
+
+    Returns:
+        list of flat indices from the root to goal inclusive
+    """
+    path = [goal]
+    i = goal
+    while parent[i] != i:
+        i = parent[i]
+        path.append(i)
+    path.reverse()
+    return path
+
+
+def record_stats(stats, expanded, peak_frontier):
+    """Accumulate search counters into an optional `stats` dict.
+
+    'expanded' adds up over calls and 'peak_frontier' keeps the maximum, so a
+    solver that runs several searches reports totals for the whole query.
+    """
+    if stats is not None:
+        stats['expanded'] = stats.get('expanded', 0) + expanded
+        stats['peak_frontier'] = max(stats.get('peak_frontier', 0), peak_frontier)
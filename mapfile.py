@@ -0,0 +1,231 @@
+"""Compiled binary map format, opened zero-copy with mmap.
+
+Layout (all integers little-endian):
+
+    cell plane     (rows + 2) * (cols + 2) bytes: the padded Grid buffer,
+                   starting at offset 0 so the mmap itself is Grid.cells
+    guard section  per guard: id length (B), id (utf-8), start row (i),
+                   start col (i), move count (I), moves (one 'R'/'L'/'U'/'D'
+                   byte each)
+    symbol index   per symbol: code (B), pad (3x), count (I), then count
+                   uint32 flat cell indices in row-major order
+    footer         FOOTER struct, always the last FOOTER.size bytes
+
+The footer sits at the end so the cell plane can start at offset 0: the
+mapped file is used as the grid buffer directly, and find()/find_indices()
+on indexed symbols return positions from the index without any scan.
+
+Usage:
+    python mapfile.py problem3_large.txt [-o problem3_large.pfm] [--problem 3]
+"""
+
+import argparse
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+from grid import Grid
+
+MAGIC = b'PFMP'
+VERSION = 1
+EXTENSION = '.pfm'
+NO_BATTERY = -1
+
+# magic, version, rows, cols, battery, guards offset/count, index offset/count
+FOOTER = struct.Struct('<4sIIIiQIQI')
+GUARD = struct.Struct('<iiI')
+SYMBOL = struct.Struct('<B3xI')
+
+# Symbols each problem looks up by position; indexed when compiling.
+SPECIAL_SYMBOLS = {
+    1: 'SEx',
+    2: 'SCD',
+    3: 'ST',
+    4: 'SH',
+    5: 'SU',
+    6: 'SO',
+    7: 'SH',
+    8: 'SEs',
+}
+DEFAULT_SYMBOLS = 'SETHUOCDxs'
+
+
+def is_map_file(filename):
+    """Return True if `filename` is a compiled map (checked by its footer magic)."""
+    try:
+        with open(filename, 'rb') as f:
+            f.seek(-FOOTER.size, os.SEEK_END)
+            return f.read(4) == MAGIC
+    except OSError:
+        return False
+
+
+def read_text_map(filename, battery_header=None):
+    """Parse any problemN text map.
+
+    Handles the plain grid format, the problem5 battery header line and the
+    problem3 GUARDS section.
+
+    Args:
+        filename: path of the text map
+        battery_header: whether the first line is a battery limit; None
+            guesses from the file (a numeric first line shorter than the
+            grid row after it, as in the problem5 maps)
+
+    Returns:
+        (lines, battery, guards): grid rows as strings, the battery limit
+        (or None) and a list of (id, row, col, moves) tuples where moves is
+        a string of 'R'/'L'/'U'/'D'
+    """
+    with open(filename, 'r') as f:
+        raw = [line.rstrip('\n') for line in f]
+
+    content = [line for line in raw if line.strip()]
+    if battery_header is None:
+        battery_header = (len(content) > 1 and content[0].strip().isdigit()
+                          and len(content[0]) < len(content[1]))
+    battery = int(content[0]) if battery_header else None
+    if battery_header:
+        raw = raw[raw.index(content[0]) + 1:]
+
+    lines = []
+    guards = []
+    parsing_grid = True
+    for line in raw:
+        if line.strip() == '' or line.startswith('GUARDS'):
+            if line.startswith('GUARDS') or (parsing_grid and lines):
+                parsing_grid = False
+            continue
+        if parsing_grid:
+            lines.append(line)
+        else:
+            parts = line.split()
+            if len(parts) >= 4:
+                moves = ''.join(m.strip() for m in parts[3].split(',') if m.strip() in 'RLUD')
+                guards.append((parts[0], int(parts[1]), int(parts[2]), moves))
+    return lines, battery, guards
+
+
+def compile_map(src, dst, problem=None):
+    """Convert a text map file to the binary format.
+
+    Args:
+        src: path of a problemN text map
+        dst: output path
+        problem: problem number; picks the indexed symbols and whether the
+            file has a battery header (guessed when None)
+
+    Returns:
+        the compiled Grid (built in memory from the text)
+    """
+    lines, battery, guards = read_text_map(src, None if problem is None else problem == 5)
+    grid = Grid.from_lines(lines)
+    symbols = SPECIAL_SYMBOLS.get(problem, DEFAULT_SYMBOLS)
+
+    with open(dst, 'wb') as f:
+        f.write(grid.cells)
+
+        guards_offset = f.tell()
+        for guard_id, row, col, moves in guards:
+            name = guard_id.encode('utf-8')
+            f.write(bytes([len(name)]) + name)
+            f.write(GUARD.pack(row, col, len(moves)))
+            f.write(moves.encode('ascii'))
+
+        index_offset = f.tell()
+        indexed = 0
+        for ch in dict.fromkeys(symbols):
+            positions = array('I', grid.find_indices(ch))
+            if not positions:
+                continue
+            if sys.byteorder != 'little':
+                positions.byteswap()
+            f.write(SYMBOL.pack(ord(ch), len(positions)))
+            f.write(positions.tobytes())
+            indexed += 1
+
+        f.write(FOOTER.pack(MAGIC, VERSION, grid.rows, grid.cols,
+                            NO_BATTERY if battery is None else battery,
+                            guards_offset, len(guards), index_offset, indexed))
+    return grid
+
+
+def open_map(filename):
+    """Memory-map a compiled map.
+
+    The returned Grid's cells buffer is the read-only mmap itself, and its
+    symbol index is served from views into the same mapping.
+
+    Returns:
+        (grid, battery, guards): battery is None when the map has none;
+        guards is a list of (id, row, col, moves) tuples as in read_text_map
+    """
+    with open(filename, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, rows, cols, battery, guards_offset, guard_count, index_offset, symbol_count = \
+        FOOTER.unpack_from(mm, len(mm) - FOOTER.size)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{filename}: not a version {VERSION} compiled map')
+
+    guards = []
+    pos = guards_offset
+    for _ in range(guard_count):
+        size = mm[pos]
+        guard_id = mm[pos + 1:pos + 1 + size].decode('utf-8')
+        pos += 1 + size
+        row, col, count = GUARD.unpack_from(mm, pos)
+        pos += GUARD.size
+        guards.append((guard_id, row, col, mm[pos:pos + count].decode('ascii')))
+        pos += count
+
+    view = memoryview(mm)
+    symbols = {}
+    pos = index_offset
+    for _ in range(symbol_count):
+        code, count = SYMBOL.unpack_from(mm, pos)
+        pos += SYMBOL.size
+        positions = view[pos:pos + 4 * count]
+        if sys.byteorder == 'little':
+            positions = positions.cast('I')
+        else:
+            positions = array('I', positions.tobytes())
+            positions.byteswap()
+        symbols[chr(code)] = positions
+        pos += 4 * count
+
+    grid = Grid(rows, cols, mm, symbols)
+    return grid, None if battery == NO_BATTERY else battery, guards
+
+
+def default_output(src):
+    """Output path for a converted map: same name with the EXTENSION suffix."""
+    return os.path.splitext(src)[0] + EXTENSION
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile problemN text maps to the binary map format.')
+    parser.add_argument('maps', nargs='+', help='text map files')
+    parser.add_argument('-o', '--output', help='output path (only with a single input map)')
+    parser.add_argument('--problem', type=int, choices=sorted(SPECIAL_SYMBOLS),
+                        help='problem number, used to pick the indexed symbols '
+                             '(default: taken from a problemN_* filename)')
+    args = parser.parse_args()
+    if args.output and len(args.maps) != 1:
+        parser.error('--output needs exactly one input map')
+
+    for src in args.maps:
+        problem = args.problem
+        if problem is None:
+            match = re.match(r'problem(\d+)_', os.path.basename(src))
+            problem = int(match.group(1)) if match else None
+        dst = args.output or default_output(src)
+        grid = compile_map(src, dst, problem)
+        print(f"{src} -> {dst} ({grid.rows} x {grid.cols}, {os.path.getsize(dst)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,41 @@
+import hashlib
+import heapq
+import os
+import struct
 import sys
+from array import array
+
+from grid import as_grid, load, passable_table, record_stats, trace_path
+from shortest_path import ENGINES, UNREACHED, scaled_costs, unscale
+
+COST_MAP = {
+    '.': 1,
+    '*': 3,
+    '~': 0.5,
+    'S': 1,
+    'C': 1,
+    'D': 1,
+}
+# fixed-point cell costs: COSTS[code] == COST_MAP[char] * SCALE
+COSTS, SCALE = scaled_costs(COST_MAP)
+DIRTY = passable_table('D')
+
+HIERARCHY_EXTENSION = '.ch'
+HIERARCHY_MAGIC = b'PCH2'
+HIERARCHY_VERSION = 1
+# magic, version, rows, cols, upward / downward edge counts, floor digest
+HIERARCHY_HEADER = struct.Struct('<4sIIIII32s')
+# Nodes a witness search may settle before the shortcut is added anyway.
+WITNESS_LIMIT = 64
 
 
 def load_grid(filename):
     """Load the grid from a file.
 
     Returns:
-        grid: list of lists of characters
+        grid: Grid (see grid.py)
     """
-    with open(filename, 'r') as f:
-        grid = [list(line.rstrip('\n')) for line in f if line.strip()]
-    return grid
+    return load(filename)
 
 
 def find_char(grid, ch):
@@ -18,12 +44,7 @@ def find_char(grid, ch):
     Returns:
         list of (row, col) tuples
     """
-    positions = []
-    for r, row in enumerate(grid):
-        for c, cell in enumerate(row):
-            if cell == ch:
-                positions.append((r, c))
-    return positions
+    return as_grid(grid).find(ch)
 
 
 def get_cell_cost(cell):
@@ -35,18 +56,32 @@ def get_cell_cost(cell):
     'S', 'C', 'D' = treated as normal floor (cost 1)
     '#' = impassable (return None)
     """
-    cost_map = {
-        '.': 1,
-        '*': 3,
-        '~': 0.5,
-        'S': 1,
-        'C': 1,
-        'D': 1,
-    }
-    return cost_map.get(cell, None)
-
-
-def find_cheapest_path(grid):
+    return COST_MAP.get(cell, None)
+
+
+def dijkstra(grid, source, reverse=False, engine='dial', stats=None):
+    """Single-source Dijkstra over the 8-connected grid.
+
+    Moving into a cell costs that cell's COSTS entry. With reverse=True the
+    distances are measured *to* `source` instead of from it, i.e. dist[i] is
+    the cost of the cheapest path i -> source.
+
+    Args:
+        engine: 'dial' (bucket queue) or 'heap' (see shortest_path.py)
+        stats: optional dict; receives 'expanded' and 'peak_frontier' counts
+
+    Returns:
+        (dist, parent): per-cell arrays; dist is in fixed-point units (divide
+        by SCALE, UNREACHED if unreachable) and parent[i] is the next cell
+        towards the source (the source is its own parent, unreached cells
+        are -1)
+    """
+    dist, parent, _ = ENGINES[engine](grid, [source], COSTS, grid.offsets8, reverse=reverse,
+                                       stats=stats)
+    return dist, parent
+
+
+def find_cheapest_path(grid, engine='dial', stats=None, hierarchy=None):
     """Find the minimum-cost path from 'S' to 'C' that visits at least one 'D' cell.
 
     Movement: 8-directional (including diagonals).
@@ -55,32 +90,425 @@ def find_cheapest_path(grid):
                 reaching 'C' (charger).
 
     Args:
-        grid: list of lists of characters
+        grid: Grid or list of lists of characters
+        engine: shortest-path engine for the two searches, 'dial' or 'heap'
+                (see shortest_path.py), or 'layered' for a single search
+                over (cell, D visited) states (see layered_path)
+        stats: optional dict; receives 'expanded' and 'peak_frontier' counts
+        hierarchy: optional ContractionHierarchy for this floor (see
+                   hierarchy_for); queries then run on it instead of
+                   `engine`: bucket many-to-many costs S -> every D and
+                   every D -> C, then one routed query per leg
 
     Returns:
         tuple: (total_cost, path) where path is a list of (row, col) positions,
                or None if no valid path exists.
     """
-    # TODO: Implement your pathfinding algorithm here
-    # Hint: Dijkstra's algorithm is ideal for weighted graphs with non-negative costs.
-    #
-    # One approach: Run Dijkstra twice:
-    #   1. From S to each D (find cheapest S -> D_i)
-    #   2. From each D to C (find cheapest D_i -> C)
-    #   Then minimize over all D_i: cost(S -> D_i) + cost(D_i -> C)
-    #
-    # Or: Use state = (row, col, visited_dirty) where visited_dirty is a boolean.
-    #
-    # Useful variables:
-    #   start = find_char(grid, 'S')[0]
-    #   charger = find_char(grid, 'C')[0]
-    #   dirty_zones = find_char(grid, 'D')
-    #
-    # 8 directions: (dr, dc) for dr in [-1,0,1] for dc in [-1,0,1] if not (dr==0 and dc==0)
+    grid = as_grid(grid)
+    start = grid.find_indices('S')
+    charger = grid.find_indices('C')
+    dirty_zones = grid.find_indices('D')
+    if not start or not charger or not dirty_zones:
+        return None
+    if hierarchy is not None:
+        return _cheapest_via_hierarchy(grid, hierarchy, start[0], dirty_zones, charger[0], stats)
+    if engine == 'layered':
+        return layered_path(grid, stats)
+
+    from_start, parent_start = dijkstra(grid, start[0], engine=engine, stats=stats)
+    to_charger, parent_charger = dijkstra(grid, charger[0], reverse=True, engine=engine,
+                                            stats=stats)
+
+    best = min(dirty_zones, key=lambda i: from_start[i] + to_charger[i])
+    if from_start[best] == UNREACHED or to_charger[best] == UNREACHED:
+        return None
+    total_cost = unscale(from_start[best] + to_charger[best], SCALE)
 
+    # trace_path runs root -> cell, so the second leg comes out reversed
+    first_leg = trace_path(parent_start, best)
+    second_leg = trace_path(parent_charger, best)[::-1]
+    return (total_cost, grid.path(first_leg + second_leg[1:]))
+
+
+def layered_path(grid, stats=None):
+    """find_cheapest_path as one Dijkstra over (cell, D visited) states.
+
+    State i + layer * grid.size is cell i with (layer 1) or without (layer
+    0) a 'D' on the path so far; entering a 'D' cell moves to layer 1.
+    Distances and parents of both layers live in two flat typed arrays and
+    the queue is a Dial bucket queue (see shortest_path.py), so no tuple
+    state is ever allocated. The search stops when 'C' is popped in layer 1,
+    after at most two layers' worth of cells instead of two full floods.
+
+    Returns:
+        tuple: (total_cost, path) as find_cheapest_path, or None
+    """
+    grid = as_grid(grid)
+    start = grid.find_indices('S')
+    charger = grid.find_indices('C')
+    if not start or not charger:
+        return None
+    start, charger = start[0], charger[0]
+    size = grid.size
+    goal = charger + size
+    cells = grid.cells
+    offsets = grid.offsets8
+    dist = array('q', [UNREACHED]) * (2 * size)
+    parent = array('i', [-1]) * (2 * size)
+    width = max(c for c in COSTS if c is not None) + 1
+    buckets = [[] for _ in range(width)]
+    dist[start] = 0
+    parent[start] = start
+    buckets[0].append(start)
+
+    pending = 1
+    expanded = peak = 0
+    d = 0
+    while pending:
+        if pending > peak:
+            peak = pending
+        bucket = buckets[d % width]
+        while bucket:
+            state = bucket.pop()
+            pending -= 1
+            if dist[state] != d:
+                continue
+            expanded += 1
+            if state == goal:
+                record_stats(stats, expanded, peak)
+                path = [s % size for s in trace_path(parent, state)]
+                return (unscale(d, SCALE), grid.path(path))
+            # Layer 1 stays in layer 1; layer 0 moves up on entering a 'D'.
+            shift, i = (size, state - size) if state >= size else (0, state)
+            for o in offsets:
+                n = i + o
+                code = cells[n]
+                cost = COSTS[code]
+                if cost is None:
+                    continue
+                nxt = n + (shift or DIRTY[code] * size)
+                nd = d + cost
+                if nd < dist[nxt]:
+                    dist[nxt] = nd
+                    parent[nxt] = state
+                    buckets[nd % width].append(nxt)
+                    pending += 1
+        d += 1
+    record_stats(stats, expanded, peak)
     return None
 
 
+def floor_digest(grid):
+    """Hash of the cost plane: identical for floors that differ only in where
+    'S', 'C' and 'D' sit (they cost the same as '.')."""
+    grid = as_grid(grid)
+    table = bytes(COSTS[code] or 0 for code in range(256))
+    h = hashlib.blake2b(digest_size=32)
+    h.update(struct.pack('<II', grid.rows, grid.cols))
+    h.update(bytes(grid.cells[:grid.size]).translate(table))
+    return h.digest()
+
+
+class ContractionHierarchy:
+    """Contraction hierarchy (CH) of the 8-connected cost grid.
+
+    Cells are contracted one at a time, cheapest first by edge difference
+    (shortcuts added minus edges removed, plus contracted neighbors). When
+    cell v goes, every pair u -> v -> x with no witness path of at most the
+    same cost around v (bounded local Dijkstra) gets a shortcut u -> x that
+    remembers v as its middle cell. Every shortest path then climbs and
+    descends the contraction order, so a query is two small searches that
+    only follow edges towards later-contracted cells.
+
+    The result is two graphs in CSR form over the grid's flat indices:
+    `up` holds each cell's edges to later cells, `down` the edges into each
+    cell from later cells (searched backwards). Each is a tuple (first,
+    head, weight, middle) of arrays: the edges of cell v are first[v] to
+    first[v + 1], middle is -1 for an original grid step. Weights are in
+    fixed-point units (see COSTS).
+
+    Attributes:
+        up, down: the upward and downward CSR graphs
+        digest: floor_digest of the grid the hierarchy belongs to
+    """
+
+    def __init__(self, grid, up, down, digest=None):
+        self.rows = grid.rows
+        self.cols = grid.cols
+        self.up = up
+        self.down = down
+        self.digest = digest or floor_digest(grid)
+
+    @classmethod
+    def build(cls, grid):
+        """Contract every passable cell of `grid` and return the hierarchy."""
+        grid = as_grid(grid)
+        cells = grid.cells
+        passable = [i for i in range(grid.size) if COSTS[cells[i]] is not None]
+        out = {i: {} for i in passable}
+        into = {i: {} for i in passable}
+        for i in passable:
+            for o in grid.offsets8:
+                cost = COSTS[cells[i + o]]
+                if cost is not None:
+                    out[i][i + o] = cost
+                    into[i + o][i] = cost
+        middle = {}
+        neighbors_done = dict.fromkeys(passable, 0)
+
+        def witness(u, v, limit, wanted):
+            # Cheapest costs from u avoiding v, up to `limit`.
+            dist = {u: 0}
+            heap = [(0, u)]
+            settled = 0
+            while heap and settled < WITNESS_LIMIT and wanted:
+                d, a = heapq.heappop(heap)
+                if d > dist[a]:
+                    continue
+                if d > limit:
+                    break
+                settled += 1
+                wanted.discard(a)
+                for b, w in out[a].items():
+                    nd = d + w
+                    if b != v and nd < dist.get(b, UNREACHED):
+                        dist[b] = nd
+                        heapq.heappush(heap, (nd, b))
+            return dist
+
+        def shortcuts(v):
+            found = []
+            for u, w1 in into[v].items():
+                targets = {x: w1 + w2 for x, w2 in out[v].items() if x != u}
+                if not targets:
+                    continue
+                dist = witness(u, v, max(targets.values()), set(targets))
+                for x, w in targets.items():
+                    if dist.get(x, UNREACHED) > w:
+                        found.append((u, x, w))
+            return found
+
+        def priority(v):
+            return len(shortcuts(v)) - len(into[v]) - len(out[v]) + neighbors_done[v]
+
+        heap = [(priority(v), v) for v in passable]
+        heapq.heapify(heap)
+        up, down = {}, {}
+        while heap:
+            _, v = heapq.heappop(heap)
+            found = shortcuts(v)
+            p = len(found) - len(into[v]) - len(out[v]) + neighbors_done[v]
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap, (p, v))
+                continue
+            for u, x, w in found:
+                if w < out[u].get(x, UNREACHED):
+                    out[u][x] = w
+                    into[x][u] = w
+                    middle[u, x] = v
+            up[v] = out.pop(v)
+            down[v] = into.pop(v)
+            for x in up[v]:
+                del into[x][v]
+                neighbors_done[x] += 1
+            for u in down[v]:
+                del out[u][v]
+                neighbors_done[u] += 1
+
+        def csr(edges, key):
+            first = array('I', [0]) * (grid.size + 1)
+            head, weight, mid = array('I'), array('I'), array('i')
+            for i in range(grid.size):
+                for j, w in edges.get(i, {}).items():
+                    head.append(j)
+                    weight.append(w)
+                    mid.append(middle.get(key(i, j), -1))
+                first[i + 1] = len(head)
+            return first, head, weight, mid
+
+        return cls(grid, csr(up, lambda i, j: (i, j)), csr(down, lambda i, j: (j, i)))
+
+    def _search(self, graph, source, stats=None):
+        """Dijkstra from `source` along one CSR graph (upward search space).
+
+        Returns:
+            (dist, parent): dicts over the settled cells
+        """
+        first, head, weight, _ = graph
+        dist = {source: 0}
+        parent = {source: source}
+        done = {}
+        heap = [(0, source)]
+        peak = 1
+        while heap:
+            if len(heap) > peak:
+                peak = len(heap)
+            d, v = heapq.heappop(heap)
+            if v in done:
+                continue
+            done[v] = d
+            for e in range(first[v], first[v + 1]):
+                u = head[e]
+                nd = d + weight[e]
+                if nd < dist.get(u, UNREACHED):
+                    dist[u] = nd
+                    parent[u] = v
+                    heapq.heappush(heap, (nd, u))
+        record_stats(stats, len(done), peak)
+        return done, parent
+
+    def distances(self, sources, targets, stats=None):
+        """Many-to-many costs with buckets.
+
+        One downward search from each target files (target, cost) in a
+        bucket at every cell it settles; one upward search from each source
+        then scans the buckets of the cells it settles.
+
+        Returns:
+            matrix[k][j]: cost sources[k] -> targets[j] in fixed-point units,
+            UNREACHED if there is no path
+        """
+        buckets = {}
+        for j, t in enumerate(targets):
+            for v, d in self._search(self.down, t, stats)[0].items():
+                buckets.setdefault(v, []).append((j, d))
+        matrix = []
+        for s in sources:
+            row = [UNREACHED] * len(targets)
+            for v, d in self._search(self.up, s, stats)[0].items():
+                for j, back in buckets.get(v, ()):
+                    if d + back < row[j]:
+                        row[j] = d + back
+            matrix.append(row)
+        return matrix
+
+    def route(self, source, target, stats=None):
+        """Cheapest path between two flat indices.
+
+        The upward search from `source` and the downward search from
+        `target` meet at the highest cell of the path; shortcuts on both
+        halves are then unpacked back to grid steps.
+
+        Returns:
+            (cost, cells): fixed-point cost and the flat indices of the path,
+            or None if target cannot be reached
+        """
+        fdist, fparent = self._search(self.up, source, stats)
+        bdist, bparent = self._search(self.down, target, stats)
+        cost, meet = UNREACHED, None
+        for v, d in fdist.items():
+            back = bdist.get(v)
+            if back is not None and d + back < cost:
+                cost, meet = d + back, v
+        if meet is None:
+            return None
+        hops = trace_path(fparent, meet) + trace_path(bparent, meet)[::-1][1:]
+        path = [hops[0]]
+        for a, b in zip(hops, hops[1:]):
+            path.extend(self.unpack(a, b))
+        return cost, path
+
+    def _middle(self, a, b):
+        for graph, v, w in ((self.up, a, b), (self.down, b, a)):
+            first, head, _, middle = graph
+            for e in range(first[v], first[v + 1]):
+                if head[e] == w:
+                    return middle[e]
+        raise KeyError((a, b))
+
+    def unpack(self, a, b):
+        """Grid cells of the hierarchy edge a -> b, excluding a."""
+        cells = []
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            m = self._middle(a, b)
+            if m < 0:
+                cells.append(b)
+            else:
+                stack.append((m, b))
+                stack.append((a, m))
+        return cells
+
+    def save(self, filename):
+        """Write the hierarchy to `filename` (little-endian)."""
+        with open(filename, 'wb') as f:
+            f.write(HIERARCHY_HEADER.pack(HIERARCHY_MAGIC, HIERARCHY_VERSION, self.rows, self.cols,
+                                          len(self.up[1]), len(self.down[1]), self.digest))
+            for table in self.up + self.down:
+                if sys.byteorder == 'big':
+                    table = array(table.typecode, table)
+                    table.byteswap()
+                table.tofile(f)
+
+    @classmethod
+    def load(cls, filename, grid):
+        """Read a hierarchy written by save(), or return None if the file is
+        missing, malformed or belongs to a different floor."""
+        grid = as_grid(grid)
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < HIERARCHY_HEADER.size:
+            return None
+        magic, version, rows, cols, up_edges, down_edges, digest = \
+            HIERARCHY_HEADER.unpack_from(data)
+        if (magic, version, rows, cols) != (HIERARCHY_MAGIC, HIERARCHY_VERSION, grid.rows, grid.cols):
+            return None
+        if len(data) != HIERARCHY_HEADER.size + 8 * (grid.size + 1) + 12 * (up_edges + down_edges):
+            return None
+        if digest != floor_digest(grid):
+            return None
+        offset = HIERARCHY_HEADER.size
+        tables = []
+        for edges in (up_edges, down_edges):
+            for code, length in (('I', grid.size + 1), ('I', edges), ('I', edges), ('i', edges)):
+                table = array(code)
+                table.frombytes(data[offset:offset + length * table.itemsize])
+                if sys.byteorder == 'big':
+                    table.byteswap()
+                tables.append(table)
+                offset += length * table.itemsize
+        return cls(grid, tuple(tables[:4]), tuple(tables[4:]), digest)
+
+
+def hierarchy_path(filename):
+    """The hierarchy file kept next to a map file."""
+    return os.path.splitext(filename)[0] + HIERARCHY_EXTENSION
+
+
+def hierarchy_for(grid, filename=None):
+    """ContractionHierarchy for a floor, reusing the one persisted next to its map.
+
+    If `filename` is given and a matching hierarchy file exists beside it,
+    it is loaded from there; otherwise it is built and, when a filename is
+    given, saved for the next query.
+    """
+    grid = as_grid(grid)
+    if filename is not None:
+        hierarchy = ContractionHierarchy.load(hierarchy_path(filename), grid)
+        if hierarchy is not None:
+            return hierarchy
+    hierarchy = ContractionHierarchy.build(grid)
+    if filename is not None:
+        hierarchy.save(hierarchy_path(filename))
+    return hierarchy
+
+
+def _cheapest_via_hierarchy(grid, hierarchy, start, dirty_zones, charger, stats=None):
+    """find_cheapest_path on a ContractionHierarchy (flat indices in)."""
+    to_dirty = hierarchy.distances([start], dirty_zones, stats)[0]
+    from_dirty = [row[0] for row in hierarchy.distances(dirty_zones, [charger], stats)]
+    total, best = min(zip(map(sum, zip(to_dirty, from_dirty)), dirty_zones))
+    if total >= UNREACHED:
+        return None
+    first_leg = hierarchy.route(start, best, stats)[1]
+    second_leg = hierarchy.route(best, charger, stats)[1]
+    return (unscale(total, SCALE), grid.path(first_leg + second_leg[1:]))
+
+
 def main():
     if len(sys.argv) != 2:
         print("Usage: python problem2.py <grid_file>")
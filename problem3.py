@@ -1,4 +1,20 @@
 import sys
+from math import lcm
+
+from bitrows import row_masks
+from grid import Grid, as_grid, passable_table, record_stats
+from mapfile import is_map_file, open_map
+
+PASSABLE = passable_table('.ST')
+
+# Upper bound on (period * guards) reservations kept by a folded timetable.
+MAX_RESERVATIONS = 1 << 20
+
+# Largest visited table (padded cells * folded time steps) kept as a flat
+# bytearray; larger state spaces are stored sparsely in a dict.
+MAX_DENSE_STATES = 1 << 24
+
+DIRECTIONS = {'R': (0, 1), 'L': (0, -1), 'U': (-1, 0), 'D': (1, 0)}
 
 
 def load_grid_and_guards(filename):
@@ -11,16 +27,26 @@ def load_grid_and_guards(filename):
             Direction sequence: comma-separated moves like "R,R,R,D,D,D,L,L,L,U,U,U"
             R=right, L=left, U=up, D=down. The sequence loops.
 
+    Compiled binary maps (see mapfile.py) are also accepted; their grid is
+    memory-mapped and the guards come from the map's guard section.
+
     Returns:
-        grid: list of lists of characters (static part, guards shown as '.')
+        grid: Grid (static part, guards shown as '.'; see grid.py)
         guards: list of dicts with keys:
             'id': guard identifier string
             'start': (row, col) starting position
             'patrol': list of (dr, dc) movement deltas
+            'cycle': list of (row, col) positions at timesteps 0..len(patrol)-1
+            'drift': (dr, dc) net displacement after one full patrol cycle
     """
     grid = []
     guards = []
-    direction_map = {'R': (0, 1), 'L': (0, -1), 'U': (-1, 0), 'D': (1, 0)}
+
+    if is_map_file(filename):
+        grid, _, specs = open_map(filename)
+        guards = [build_guard(guard_id, (start_row, start_col), moves)
+                  for guard_id, start_row, start_col, moves in specs]
+        return grid, guards
 
     with open(filename, 'r') as f:
         lines = [line.rstrip('\n') for line in f]
@@ -36,22 +62,51 @@ def load_grid_and_guards(filename):
             continue
 
         if parsing_grid:
-            grid.append(list(line))
+            grid.append(line)
         else:
             parts = line.split()
             if len(parts) >= 4:
                 guard_id = parts[0]
                 start_row = int(parts[1])
                 start_col = int(parts[2])
-                moves = parts[3].split(',')
-                patrol = [direction_map[m.strip()] for m in moves if m.strip() in direction_map]
-                guards.append({
-                    'id': guard_id,
-                    'start': (start_row, start_col),
-                    'patrol': patrol
-                })
+                moves = [m.strip() for m in parts[3].split(',')]
+                guards.append(build_guard(guard_id, (start_row, start_col), moves))
+
+    return Grid.from_lines(grid), guards
 
-    return grid, guards
+
+def build_guard(guard_id, start, moves):
+    """Build a guard dict (see load_grid_and_guards) from 'R'/'L'/'U'/'D' moves.
+
+    Unknown move letters are ignored.
+    """
+    patrol = [DIRECTIONS[m] for m in moves if m in DIRECTIONS]
+    cycle, drift = patrol_cycle(start, patrol)
+    return {
+        'id': guard_id,
+        'start': start,
+        'patrol': patrol,
+        'cycle': cycle,
+        'drift': drift,
+    }
+
+
+def patrol_cycle(start, patrol):
+    """Replay one full patrol cycle.
+
+    Returns:
+        (cycle, drift): the positions at timesteps 0..len(patrol)-1 (just
+        [start] for an empty patrol) and the net (dr, dc) displacement of one
+        cycle, which is (0, 0) for a closed patrol loop
+    """
+    r, c = start
+    cycle = [(r, c)]
+    for dr, dc in patrol:
+        r += dr
+        c += dc
+        cycle.append((r, c))
+    end = cycle.pop() if patrol else start
+    return cycle, (end[0] - start[0], end[1] - start[1])
 
 
 def get_guard_position(guard, timestep):
@@ -61,6 +116,9 @@ def get_guard_position(guard, timestep):
     At timestep 0, the guard is at start.
     At timestep t, the guard has made t moves following the patrol cycle.
 
+    Uses the guard's precomputed 'cycle' and 'drift' (see load_grid_and_guards)
+    so the lookup is O(1) instead of replaying t moves.
+
     Args:
         guard: dict with 'start' and 'patrol' keys
         timestep: integer >= 0
@@ -68,64 +126,329 @@ def get_guard_position(guard, timestep):
     Returns:
         (row, col) position of the guard at that timestep
     """
-    r, c = guard['start']
-    patrol = guard['patrol']
-    if not patrol:
-        return (r, c)
-    for t in range(timestep):
-        dr, dc = patrol[t % len(patrol)]
-        r += dr
-        c += dc
-    return (r, c)
+    if 'cycle' in guard:
+        cycle, drift = guard['cycle'], guard['drift']
+    else:
+        cycle, drift = patrol_cycle(guard['start'], guard['patrol'])
+    laps, phase = divmod(timestep, len(cycle))
+    r, c = cycle[phase]
+    return (r + laps * drift[0], c + laps * drift[1])
+
+
+class GuardTimetable:
+    """Space-time reservation table answering "is cell i occupied at time t".
+
+    Closed patrols repeat every len(patrol) steps, so the combined guard
+    configuration repeats with period LCM(patrol lengths). While
+    period * guards stays within MAX_RESERVATIONS the timetable folds every
+    guard into one set of occupied cells per phase t % period. Past that it
+    falls back to a per-cell list of (guard period, phases), which is still
+    O(guards visiting the cell) per lookup and O(total patrol length) memory.
+    Guards whose patrol does not return to its start (non-zero drift) never
+    repeat and are checked individually with get_guard_position arithmetic
+    on (row, col), so a guard drifting off one edge never reappears on the
+    far side. A guard outside the grid occupies no cell.
+
+    Attributes:
+        period: period after which the whole guard configuration repeats,
+                or None if some guard drifts and it never repeats
+        folded: True if occupancy is stored as one cell set per phase
+        cycles: per-guard list of flat cell indices for one patrol cycle
+                (None where the guard is outside the grid)
+    """
+
+    def __init__(self, grid, guards, max_reservations=MAX_RESERVATIONS):
+        grid = as_grid(grid)
+        self.grid = grid
+        self.cycles = []
+        self.drifting = []
+        closed = []
+        for guard in guards:
+            cycle, drift = guard.get('cycle'), guard.get('drift')
+            if cycle is None:
+                cycle, drift = patrol_cycle(guard['start'], guard['patrol'])
+            indices = [self._cell(r, c) for r, c in cycle]
+            self.cycles.append(indices)
+            if drift == (0, 0):
+                closed.append(indices)
+            else:
+                self.drifting.append((cycle, drift))
+
+        self.closed = closed
+        fold = lcm(*(len(cycle) for cycle in closed)) if closed else 1
+        self.period = None if self.drifting else fold
+        self.folded = fold * len(closed) <= max_reservations
+        if self.folded:
+            self.fold = fold
+            self.slots = [set() for _ in range(fold)]
+            for cycle in closed:
+                for t in range(fold):
+                    i = cycle[t % len(cycle)]
+                    if i is not None:
+                        self.slots[t].add(i)
+            self.visits = None
+        else:
+            self.slots = None
+            self.visits = {}
+            for cycle in closed:
+                phases = {}
+                for t, i in enumerate(cycle):
+                    if i is not None:
+                        phases.setdefault(i, set()).add(t)
+                for i, ts in phases.items():
+                    self.visits.setdefault(i, []).append((len(cycle), frozenset(ts)))
+
+    def _cell(self, r, c):
+        """Flat index of (r, c), or None outside the grid."""
+        if 0 <= r < self.grid.rows and 0 <= c < self.grid.cols:
+            return self.grid.index(r, c)
+        return None
+
+    def _drifted(self, t):
+        """Flat indices of the drifting guards inside the grid at time `t`."""
+        for cycle, (dr, dc) in self.drifting:
+            laps, phase = divmod(t, len(cycle))
+            r, c = cycle[phase]
+            i = self._cell(r + laps * dr, c + laps * dc)
+            if i is not None:
+                yield i
+
+    def occupied(self, i, t):
+        """Return True if any guard stands on flat cell index `i` at time `t`."""
+        if self.folded:
+            if i in self.slots[t % self.fold]:
+                return True
+        else:
+            for length, phases in self.visits.get(i, ()):
+                if t % length in phases:
+                    return True
+        return i in self._drifted(t)
+
+    def positions(self, t):
+        """Flat cell indices of every guard inside the grid at time `t`."""
+        cells = [cycle[t % len(cycle)] for cycle in self.closed]
+        cells = [i for i in cells if i is not None]
+        cells.extend(self._drifted(t))
+        return cells
+
+    def is_occupied(self, r, c, t):
+        """Return True if any guard stands on (r, c) at time `t`."""
+        i = self._cell(r, c)
+        return i is not None and self.occupied(i, t)
 
 
 def find_char(grid, ch):
     """Find all positions of a character in the grid."""
-    positions = []
-    for r, row in enumerate(grid):
-        for c, cell in enumerate(row):
-            if cell == ch:
-                positions.append((r, c))
-    return positions
+    return as_grid(grid).find(ch)
+
+
+def search_period(grid, timetable):
+    """Time folding used by the searches over (cell, t) states.
+
+    Returns:
+        (period, horizon): states are deduped on t mod period; horizon is
+        None when the guard period folds time, else the rows * cols * 2
+        time limit (a drifting guard, or a period longer than that limit)
+    """
+    horizon = grid.rows * grid.cols * 2
+    period = timetable.period
+    if period is not None and period <= horizon:
+        return period, None
+    return horizon + 1, horizon
 
 
-def find_safe_path(grid, guards):
+def find_safe_path(grid, guards, timetable=None, engine='bfs', stats=None,
+                   max_dense_states=MAX_DENSE_STATES):
     """Find a path from 'S' to 'T' that avoids all guards at every timestep.
 
     Movement: 4-directional (up, down, left, right) + option to WAIT in place.
     You move first, then guards move. At each timestep, you cannot occupy the
     same cell as any guard AFTER both have moved.
 
-    The state space is (row, col, timestep). You need to search through
-    time-expanded positions.
+    The state space is (row, col, timestep). Once the guard configuration
+    repeats with period P, states (row, col, t) and (row, col, t + P) have
+    identical futures, so the search dedupes on (row, col, t mod P) and keeps
+    only the earliest arrival. Explored states are bounded by cells * P, and
+    the search proves impossibility as soon as a time layer adds no new
+    folded state. When some guard never repeats (its patrol does not return
+    to its start), or P is longer than rows * cols * 2, the search instead
+    runs unfolded up to that rows * cols * 2 time limit.
+
+    Visited states live in a flat bytearray when the timetable is folded and
+    cells * P fits in `max_dense_states`; otherwise a dict keyed by the
+    folded state holds only the states actually reached, so a long LCM
+    period costs nothing up front.
 
     Args:
-        grid: list of lists of characters
+        grid: Grid or list of lists of characters
         guards: list of guard dicts (see load_grid_and_guards)
+        timetable: optional prebuilt GuardTimetable for these guards, so
+                   repeated queries on the same museum share it
+        engine: 'bfs' (state by state) or 'bitset' (whole time layers as
+                row bitsets, see bitset_safe_path)
+        stats: optional dict; receives 'expanded' and 'peak_frontier' counts
+        max_dense_states: largest state space kept as a flat bytearray
 
     Returns:
         tuple: (num_steps, path) where path is list of (row, col) at each timestep,
                or None if no safe path exists.
-               Use a reasonable max timestep limit (e.g., rows * cols * 2) to detect
-               impossible cases.
     """
-    # TODO: Implement your pathfinding algorithm here
-    # Hint: State = (row, col, time). This is A* or BFS on a time-expanded graph.
-    #
-    # At each state, you can move in 4 directions or WAIT (5 possible actions).
-    # After you move to (nr, nc) at time t+1, check that no guard is at (nr, nc)
-    # at time t+1.
-    #
-    # Use get_guard_position(guard, t) to find where each guard is at time t.
-    #
-    # Useful variables:
-    #   start = find_char(grid, 'S')[0]
-    #   treasure = find_char(grid, 'T')[0]
-    #   max_time = len(grid) * len(grid[0]) * 2  # reasonable upper bound
+    if engine == 'bitset':
+        return bitset_safe_path(grid, guards, timetable, stats)
+    grid = as_grid(grid)
+    start = grid.find_indices('S')
+    treasure = grid.find_indices('T')
+    if not start or not treasure:
+        return None
+    start, treasure = start[0], treasure[0]
+
+    if timetable is None:
+        timetable = GuardTimetable(grid, guards)
+    occupied = timetable.occupied
 
+    cells = grid.cells
+    size = grid.size
+    moves = (0,) + grid.offsets4
+    period, horizon = search_period(grid, timetable)
+    # seen[phase * size + cell] holds 1 + the index in `moves` of the move
+    # that first reached the state (0 or no key = unseen)
+    if timetable.folded and period * size <= max_dense_states:
+        seen = bytearray(period * size)
+        known = seen.__getitem__
+    else:
+        seen = {}
+        known = seen.__contains__
+
+    seen[start] = len(moves) + 1
+    frontier = [start]
+    expanded = peak = 0
+    t = 0
+    while frontier and t != horizon:
+        expanded += len(frontier)
+        if len(frontier) > peak:
+            peak = len(frontier)
+        base = (t + 1) % period * size
+        next_frontier = []
+        for i in frontier:
+            for k, m in enumerate(moves):
+                n = i + m
+                if not PASSABLE[cells[n]] or known(base + n) or occupied(n, t + 1):
+                    continue
+                seen[base + n] = k + 1
+                if n == treasure:
+                    record_stats(stats, expanded, peak)
+                    path = [n]
+                    for step in range(t + 1, 0, -1):
+                        n -= moves[seen[step % period * size + n] - 1]
+                        path.append(n)
+                    return (t + 1, grid.path(reversed(path)))
+                next_frontier.append(n)
+        frontier = next_frontier
+        t += 1
+
+    record_stats(stats, expanded, peak)
     return None
 
 
+def bitset_safe_path(grid, guards, timetable=None, stats=None):
+    """find_safe_path as time-layer reachability on row bitsets.
+
+    The cells first reached at time t + 1 are the cells reached at time t
+    dilated by the 4-neighborhood plus waiting, AND passable, AND NOT held
+    by a guard at t + 1; each row is one integer (see bitrows.py), so a
+    whole layer costs a few integer operations per row it touches instead
+    of one Python step per (row, col, t) state. Guard occupancy comes from
+    a per-time plane of row bitsets built from GuardTimetable.positions
+    (cached per phase when the configuration repeats), and states are
+    deduped on t mod period exactly as in find_safe_path.
+
+    Every layer's newly reached cells are kept, which is enough to rebuild
+    the path: the cell before n at time t is the neighbor of n (or n
+    itself) in layer t - 1.
+
+    Returns:
+        tuple: (num_steps, path) as find_safe_path, or None
+    """
+    grid = as_grid(grid)
+    start = grid.find('S')
+    treasure = grid.find('T')
+    if not start or not treasure:
+        return None
+    (sr, sc), (tr, tc) = start[0], treasure[0]
+    if timetable is None:
+        timetable = GuardTimetable(grid, guards)
+
+    rows, cols = grid.rows, grid.cols
+    free = row_masks(grid, PASSABLE)
+    period, horizon = search_period(grid, timetable)
+    planes = {}
+
+    def guard_rows(t):
+        phase = t % period
+        plane = planes.get(phase)
+        if plane is None:
+            plane = {}
+            # positions() drops guards outside the grid, so every index
+            # is a real cell and maps back to its own (row, col)
+            for i in timetable.positions(t):
+                r, c = grid.position(i)
+                plane[r] = plane.get(r, 0) | 1 << c
+            if horizon is None:
+                planes[phase] = plane
+        return plane
+
+    # seen[phase]: per-row bitsets of the folded states reached so far,
+    # allocated the first time a phase is reached (unused when unfolded)
+    seen = {0: {sr: 1 << sc}}
+    frontier = {sr: 1 << sc}
+    layers = [frontier]
+    expanded = peak = 0
+    t = 0
+    while frontier and t != horizon:
+        size = sum(bits.bit_count() for bits in frontier.values())
+        expanded += size
+        if size > peak:
+            peak = size
+        guard = guard_rows(t + 1)
+        known = seen.setdefault((t + 1) % period, {}) if horizon is None else {}
+        touched = set()
+        for r in frontier:
+            touched.update((r - 1, r, r + 1))
+        grown = {}
+        for r in touched:
+            if not 0 <= r < rows:
+                continue
+            row = frontier.get(r, 0)
+            new = (row | (row << 1) | (row >> 1) | frontier.get(r - 1, 0) | frontier.get(r + 1, 0)) \
+                & free[r] & ~(guard.get(r, 0) | known.get(r, 0))
+            if new:
+                grown[r] = new
+                known[r] = known.get(r, 0) | new
+        frontier = grown
+        layers.append(frontier)
+        t += 1
+        if frontier.get(tr, 0) >> tc & 1:
+            record_stats(stats, expanded, peak)
+            return (t, _trace_layers(layers, tr, tc))
+
+    record_stats(stats, expanded, peak)
+    return None
+
+
+def _trace_layers(layers, r, c):
+    """Walk the layers of bitset_safe_path back from (r, c) at the last one."""
+    path = [(r, c)]
+    for layer in reversed(layers[:-1]):
+        for dr, dc in ((0, 0),) + tuple(DIRECTIONS.values()):
+            pr, pc = r + dr, c + dc
+            if pc >= 0 and layer.get(pr, 0) >> pc & 1:
+                r, c = pr, pc
+                break
+        path.append((r, c))
+    path.reverse()
+    return path
+
+
 def main():
     if len(sys.argv) != 2:
         print("Usage: python problem3.py <data_file>")
@@ -140,9 +463,13 @@ def main():
     print(f"Number of guards: {len(guards)}")
     for g in guards:
         print(f"  {g['id']}: starts at {g['start']}, patrol length {len(g['patrol'])}")
+
+    timetable = GuardTimetable(grid, guards)
+    if timetable.period is not None:
+        print(f"Guard configuration period: {timetable.period}")
     print()
 
-    result = find_safe_path(grid, guards)
+    result = find_safe_path(grid, guards, timetable)
 
     if result is None:
         print("No safe path to treasure found!")
@@ -1,4 +1,11 @@
+import hashlib
+import heapq
+import os
+import struct
 import sys
+from array import array
+
+from grid import as_grid, load, record_stats, trace_path
 
 
 def load_grid(filename):
@@ -7,21 +14,14 @@ def load_grid(filename):
     Grid contains: digits 0-9 (altitude), 'S' (start), 'H' (hiker), '#' (cliff).
 
     Returns:
-        grid: list of lists of characters
+        grid: Grid (see grid.py)
     """
-    with open(filename, 'r') as f:
-        grid = [list(line.rstrip('\n')) for line in f if line.strip()]
-    return grid
+    return load(filename)
 
 
 def find_char(grid, ch):
     """Find all positions of a character in the grid."""
-    positions = []
-    for r, row in enumerate(grid):
-        for c, cell in enumerate(row):
-            if cell == ch:
-                positions.append((r, c))
-    return positions
+    return as_grid(grid).find(ch)
 
 
 def get_altitude(cell):
@@ -56,7 +56,337 @@ def movement_cost(alt_from, alt_to):
     return 1
 
 
-def find_rescue_path(grid):
+ALTITUDES = [get_altitude(chr(code)) for code in range(128)] + [None] * 128
+MAX_MOVE_COST = movement_cost(0, 9)
+
+# Altitude code per cell code: the altitude for passable cells, else IMPASSABLE.
+IMPASSABLE = 10
+ALTITUDE_CODES = bytes(IMPASSABLE if a is None else a for a in ALTITUDES)
+# Altitude code -> code * 16, so a source and a target code add up to one
+# pair byte (at most 10 * 16 + 10, so bytes never carry into each other).
+HIGH_NIBBLE = bytes(min(code, 15) * 16 for code in range(256))
+# Pair byte (source * 16 + target) -> move cost, 0 if either end is impassable.
+PAIR_COSTS = bytes(movement_cost(p >> 4, p & 15) if p >> 4 < IMPASSABLE and p & 15 < IMPASSABLE else 0
+                   for p in range(256))
+
+
+def window(data, start, stop, fill):
+    """Return bytes(data[start:stop]), with `fill` for positions outside data."""
+    size = len(data)
+    head = bytes([fill]) * (min(stop, 0) - start) if start < 0 else b''
+    tail = bytes([fill]) * (stop - max(start, size)) if stop > size else b''
+    lo = min(max(start, 0), size)
+    return head + bytes(data[lo:max(min(stop, size), lo)]) + tail
+
+
+class Terrain:
+    """Compiled terrain: an altitude plane and per-direction edge costs.
+
+    Compilation is vectorized: the altitude plane is the cell buffer passed
+    through a translate table, and each direction's costs come from adding
+    the (shifted) altitude planes as big integers, one byte per cell, and
+    translating the resulting pair bytes through PAIR_COSTS. A search then
+    only indexes byte arrays instead of calling get_altitude and
+    movement_cost per edge.
+
+    Attributes:
+        altitude: per-cell altitude codes (IMPASSABLE for cliffs and padding)
+        edges: 8 per-cell cost planes aligned with grid.offsets8;
+               edges[k][i] is the cost of moving from i to i + offsets8[k],
+               0 if either end is impassable
+    """
+
+    def __init__(self, grid):
+        grid = as_grid(grid)
+        self.grid = grid
+        self.altitude = bytearray([IMPASSABLE]) * grid.size
+        self.edges = [bytearray(grid.size) for _ in grid.offsets8]
+        self.rebuild()
+
+    def rebuild(self, top=0, bottom=None):
+        """Recompile map rows top..bottom after their cells changed.
+
+        Edges leaving the rows just above and below point into the changed
+        band, so those rows are recompiled as well.
+        """
+        grid = self.grid
+        stride = grid.stride
+        if bottom is None:
+            bottom = grid.rows - 1
+        lo, hi = (top + 1) * stride, (bottom + 2) * stride
+        self.altitude[lo:hi] = bytes(grid.cells[lo:hi]).translate(ALTITUDE_CODES)
+
+        lo, hi = max(lo - stride, 0), min(hi + stride, grid.size)
+        altitude = self.altitude
+        source = int.from_bytes(bytes(altitude[lo:hi]).translate(HIGH_NIBBLE), 'little')
+        for plane, o in zip(self.edges, grid.offsets8):
+            target = int.from_bytes(window(altitude, lo + o, hi + o, IMPASSABLE), 'little')
+            plane[lo:hi] = (source + target).to_bytes(hi - lo, 'little').translate(PAIR_COSTS)
+
+    def set(self, r, c, ch):
+        """Change one cell and recompile only the rows around it.
+
+        Landmarks built for the old terrain may overestimate afterwards;
+        rebuild them (landmarks_for notices the changed digest).
+        """
+        self.grid.set(r, c, ch)
+        self.rebuild(r, r)
+
+    def incoming(self):
+        """Per-direction planes of costs *into* each cell.
+
+        incoming()[k][i] is the cost of moving from i + offsets8[k] to i,
+        for searches that run backwards from a target.
+        """
+        offsets = self.grid.offsets8
+        size = self.grid.size
+        opposite = {o: k for k, o in enumerate(offsets)}
+        return [window(self.edges[opposite[-o]], o, size + o, 0) for o in offsets]
+
+
+# Number of ALT landmarks picked by Landmarks.build.
+LANDMARKS = 8
+LANDMARK_EXTENSION = '.alt'
+LANDMARK_MAGIC = b'PALT'
+LANDMARK_VERSION = 1
+# magic, version, rows, cols, landmark count, item size, terrain digest
+LANDMARK_HEADER = struct.Struct('<4sIIIII32s')
+UNREACHED = -1
+
+
+def terrain_digest(grid):
+    """Digest of the altitude plane, identifying a terrain.
+
+    Cells are hashed through ALTITUDE_CODES, so 'S' and 'H' count as the
+    altitude-0 cells they are and moving them keeps the digest.
+    """
+    h = hashlib.blake2b(digest_size=32)
+    h.update(struct.pack('<II', grid.rows, grid.cols))
+    h.update(bytes(grid.cells[:grid.size]).translate(ALTITUDE_CODES))
+    return h.digest()
+
+
+def altitude_distances(grid, source, reverse=False, terrain=None):
+    """Exact effort from `source` to every cell, or from every cell to it.
+
+    Move costs are small integers (1..MAX_MOVE_COST), so Dijkstra runs on a
+    circular bucket queue (see shortest_path.dial).
+
+    Args:
+        grid: Grid
+        source: flat index
+        reverse: measure the effort of reaching `source` instead of leaving it
+        terrain: optional compiled Terrain for this grid
+
+    Returns:
+        array('q') of per-cell costs, UNREACHED where there is no path
+    """
+    if terrain is None:
+        terrain = Terrain(grid)
+    moves = list(zip(grid.offsets8, terrain.incoming() if reverse else terrain.edges))
+    dist = array('q', [UNREACHED]) * grid.size
+    width = MAX_MOVE_COST + 1
+    buckets = [[] for _ in range(width)]
+    dist[source] = 0
+    buckets[0].append(source)
+    pending = 1
+    d = 0
+    while pending:
+        bucket = buckets[d % width]
+        while bucket:
+            i = bucket.pop()
+            pending -= 1
+            if dist[i] != d:
+                continue
+            for o, plane in moves:
+                cost = plane[i]
+                if not cost:
+                    continue
+                n = i + o
+                nd = d + cost
+                if dist[n] == UNREACHED or nd < dist[n]:
+                    dist[n] = nd
+                    buckets[nd % width].append(n)
+                    pending += 1
+        d += 1
+    return dist
+
+
+class Landmarks:
+    """ALT (A*, landmarks, triangle inequality) distance tables for a terrain.
+
+    For each landmark L the tables hold the exact effort L -> v and v -> L
+    for every cell v. For any cells v and t, the triangle inequality gives
+    effort(v, t) >= effort(L, t) - effort(L, v) and
+    effort(v, t) >= effort(v, L) - effort(t, L); the maximum over all
+    landmarks is an admissible, consistent A* heuristic that follows the
+    real uphill costs instead of a flat per-step bound.
+
+    Tables are stored compactly as uint16 arrays (uint32 if some effort does
+    not fit), with the type's largest value marking unreachable cells, and
+    can be persisted next to the map file (see landmarks_for).
+
+    Attributes:
+        indices: flat indices of the landmarks
+        forward: per landmark, array of efforts from the landmark
+        reverse: per landmark, array of efforts to the landmark
+        missing: the value stored for unreachable cells
+        digest: terrain_digest of the grid the tables belong to
+    """
+
+    def __init__(self, grid, indices, forward, reverse, digest=None):
+        self.rows = grid.rows
+        self.cols = grid.cols
+        self.indices = indices
+        self.forward = forward
+        self.reverse = reverse
+        self.missing = (1 << 8 * forward[0].itemsize) - 1 if forward else 0
+        self.digest = digest or terrain_digest(grid)
+
+    @classmethod
+    def build(cls, grid, count=LANDMARKS, terrain=None):
+        """Pick `count` landmarks by farthest-point selection and tabulate them.
+
+        The first landmark is the cell farthest from 'S' (or from the first
+        passable cell); each further one is the reachable cell whose nearest
+        landmark (by round-trip effort) is farthest away, which spreads the
+        landmarks to the edges of the terrain where their bounds are tight.
+        """
+        grid = as_grid(grid)
+        if terrain is None:
+            terrain = Terrain(grid)
+        seed = grid.find_indices('S')
+        if seed:
+            seed = seed[0]
+        else:
+            seed = next((i for i, a in enumerate(terrain.altitude) if a != IMPASSABLE), None)
+        if seed is None:
+            return cls(grid, [], [], [])
+
+        nearest = altitude_distances(grid, seed, terrain=terrain)
+        indices, forward, reverse = [], [], []
+        for _ in range(count):
+            landmark = max(range(grid.size), key=nearest.__getitem__)
+            if nearest[landmark] <= 0:
+                break
+            fwd = altitude_distances(grid, landmark, terrain=terrain)
+            rev = altitude_distances(grid, landmark, reverse=True, terrain=terrain)
+            indices.append(landmark)
+            forward.append(fwd)
+            reverse.append(rev)
+            for i in range(grid.size):
+                if fwd[i] == UNREACHED or rev[i] == UNREACHED:
+                    # no round trip through this landmark (a one-way drop)
+                    continue
+                if not indices[1:] or fwd[i] + rev[i] < nearest[i]:
+                    nearest[i] = fwd[i] + rev[i]
+            nearest[landmark] = 0
+
+        largest = max((d for table in forward + reverse for d in table), default=0)
+        typecode = 'H' if largest < 0xFFFF else 'I'
+        missing = (1 << 8 * array(typecode).itemsize) - 1
+        forward = [array(typecode, (missing if d == UNREACHED else d for d in t)) for t in forward]
+        reverse = [array(typecode, (missing if d == UNREACHED else d for d in t)) for t in reverse]
+        return cls(grid, indices, forward, reverse)
+
+    def heuristic(self, target):
+        """Return h(i): the landmark lower bound on the effort from i to `target`."""
+        missing = self.missing
+        terms = [(fwd, fwd[target], rev, rev[target])
+                 for fwd, rev in zip(self.forward, self.reverse)
+                 if fwd[target] != missing]
+
+        def h(i):
+            best = 0
+            for fwd, to_target, rev, from_target in terms:
+                from_landmark = fwd[i]
+                # A missing entry only means the landmark cannot reach i (i
+                # may still reach the target), so its forward term is
+                # skipped to keep the bound admissible.
+                if from_landmark != missing:
+                    bound = to_target - from_landmark
+                    if bound > best:
+                        best = bound
+                bound = rev[i] - from_target
+                if bound > best:
+                    best = bound
+            return best
+        return h
+
+    def save(self, filename):
+        """Write the tables to `filename` (little-endian)."""
+        itemsize = self.forward[0].itemsize if self.forward else 2
+        with open(filename, 'wb') as f:
+            f.write(LANDMARK_HEADER.pack(LANDMARK_MAGIC, LANDMARK_VERSION, self.rows, self.cols,
+                                         len(self.indices), itemsize, self.digest))
+            for table in [array('I', self.indices)] + self.forward + self.reverse:
+                if sys.byteorder == 'big':
+                    table = array(table.typecode, table)
+                    table.byteswap()
+                table.tofile(f)
+
+    @classmethod
+    def load(cls, filename, grid):
+        """Read tables written by save(), or return None if the file is
+        missing, malformed or belongs to a different terrain."""
+        grid = as_grid(grid)
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < LANDMARK_HEADER.size:
+            return None
+        magic, version, rows, cols, count, itemsize, digest = LANDMARK_HEADER.unpack_from(data)
+        if (magic, version, rows, cols) != (LANDMARK_MAGIC, LANDMARK_VERSION, grid.rows, grid.cols):
+            return None
+        typecode = {2: 'H', 4: 'I'}.get(itemsize)
+        if typecode is None or digest != terrain_digest(grid):
+            return None
+        if len(data) != LANDMARK_HEADER.size + 4 * count + 2 * count * grid.size * itemsize:
+            return None
+
+        offset = LANDMARK_HEADER.size
+        tables = []
+        for code, length in [('I', count)] + [(typecode, grid.size)] * (2 * count):
+            table = array(code)
+            table.frombytes(data[offset:offset + length * table.itemsize])
+            if sys.byteorder == 'big':
+                table.byteswap()
+            tables.append(table)
+            offset += length * table.itemsize
+        indices = list(tables[0])
+        return cls(grid, indices, tables[1:1 + count], tables[1 + count:], digest)
+
+
+def landmark_path(filename):
+    """The landmark file kept next to a map file."""
+    return os.path.splitext(filename)[0] + LANDMARK_EXTENSION
+
+
+def landmarks_for(grid, filename=None, count=LANDMARKS):
+    """Landmarks for a terrain, reusing the tables persisted next to its map.
+
+    If `filename` is given and a matching landmark file exists beside it the
+    tables are loaded from there; otherwise they are built and, when a
+    filename is given, saved for the next query. Stored tables with fewer
+    than `count` landmarks (or than the terrain's passable cells, if fewer)
+    are rebuilt.
+    """
+    grid = as_grid(grid)
+    if filename is not None:
+        landmarks = Landmarks.load(landmark_path(filename), grid)
+        altitude = bytes(grid.cells[:grid.size]).translate(ALTITUDE_CODES)
+        usable = len(altitude) - altitude.count(IMPASSABLE)
+        if landmarks is not None and len(landmarks.indices) >= min(count, usable):
+            return landmarks
+    landmarks = Landmarks.build(grid, count)
+    if filename is not None:
+        landmarks.save(landmark_path(filename))
+    return landmarks
+
+
+def find_rescue_path(grid, landmarks=None, terrain=None, stats=None):
     """Find the minimum-effort path from 'S' to 'H' across mountainous terrain.
 
     Movement: 8-directional (including diagonals).
@@ -64,25 +394,72 @@ def find_rescue_path(grid):
     '#' cells are impassable cliffs.
 
     Args:
-        grid: list of lists of characters
+        grid: Grid or list of lists of characters
+        landmarks: optional Landmarks for this terrain (see landmarks_for);
+                   their ALT bound sharpens the A* heuristic
+        terrain: optional compiled Terrain for this grid, so repeated
+                 queries (or a terrain edited with Terrain.set) reuse it
+        stats: optional dict; receives 'expanded' and 'peak_frontier' counts
 
     Returns:
         tuple: (total_cost, path) where path is list of (row, col) positions,
                or None if no path exists.
     """
-    # TODO: Implement your pathfinding algorithm here
-    # Hint: A* with an admissible heuristic works well here.
-    #   - Euclidean distance * minimum_cost(1) is admissible.
-    #   - Greedy Best-First (using just the heuristic) is fast but suboptimal.
-    #   - Dijkstra works but is slower without a heuristic.
-    #
-    # Use get_altitude() and movement_cost() to compute edge weights.
-    #
-    # Useful variables:
-    #   start = find_char(grid, 'S')[0]
-    #   hiker = find_char(grid, 'H')[0]
-    #   8 directions: [(dr, dc) for dr in [-1,0,1] for dc in [-1,0,1] if not (dr==0 and dc==0)]
+    grid = as_grid(grid)
+    start = grid.find_indices('S')
+    hiker = grid.find_indices('H')
+    if not start or not hiker:
+        return None
+    start, hiker = start[0], hiker[0]
+
+    # Every move costs at least 1 and a diagonal covers one row and one
+    # column, so Chebyshev distance is the tight admissible bound here.
+    stride = grid.stride
+    hr, hc = divmod(hiker, stride)
+
+    def chebyshev(i):
+        r, c = divmod(i, stride)
+        return max(abs(r - hr), abs(c - hc))
+
+    if landmarks is None:
+        heuristic = chebyshev
+    else:
+        landmark_bound = landmarks.heuristic(hiker)
+
+        def heuristic(i):
+            return max(chebyshev(i), landmark_bound(i))
+
+    if terrain is None:
+        terrain = Terrain(grid)
+    moves = list(zip(grid.offsets8, terrain.edges))
+    dist = [float('inf')] * grid.size
+    parent = array('i', [-1]) * grid.size
+    dist[start] = 0
+    parent[start] = start
+    heap = [(heuristic(start), 0, start)]
+    expanded = peak = 0
+    while heap:
+        if len(heap) > peak:
+            peak = len(heap)
+        _, d, i = heapq.heappop(heap)
+        if d > dist[i]:
+            continue
+        expanded += 1
+        if i == hiker:
+            record_stats(stats, expanded, peak)
+            return (d, grid.path(trace_path(parent, i)))
+        for o, plane in moves:
+            cost = plane[i]
+            if not cost:
+                continue
+            n = i + o
+            nd = d + cost
+            if nd < dist[n]:
+                dist[n] = nd
+                parent[n] = i
+                heapq.heappush(heap, (nd + heuristic(n), nd, n))
 
+    record_stats(stats, expanded, peak)
     return None
 
 
@@ -93,13 +470,15 @@ def main():
 
     filename = sys.argv[1]
     grid = load_grid(filename)
+    landmarks = landmarks_for(grid, filename)
 
     print(f"Grid size: {len(grid)} x {len(grid[0])}")
     print(f"Start (base camp): {find_char(grid, 'S')}")
     print(f"Hiker location: {find_char(grid, 'H')}")
+    print(f"Landmarks: {grid.path(landmarks.indices)} ({landmark_path(filename)})")
     print()
 
-    result = find_rescue_path(grid)
+    result = find_rescue_path(grid, landmarks)
 
     if result is None:
         print("No path to hiker found!")
@@ -1,4 +1,16 @@
 import sys
+from array import array
+from collections import OrderedDict, deque
+from heapq import heapify, heappop, heappush
+
+from grid import Grid, as_grid, passable_table, record_stats
+from mapfile import is_map_file, open_map
+
+PASSABLE = passable_table('.SU><^v')
+SURFACE = ord('U')
+
+# Entries kept by ida_escape's transposition table.
+TABLE_SIZE = 1 << 18
 
 
 def load_grid_and_battery(filename):
@@ -8,26 +20,28 @@ def load_grid_and_battery(filename):
         First line: integer k (battery limit for resisting currents)
         Remaining lines: the grid
 
+    Compiled binary maps (see mapfile.py) are also accepted; the battery
+    limit is stored in their footer.
+
     Returns:
-        grid: list of lists of characters
+        grid: Grid (see grid.py)
         battery: integer max number of current resists allowed
     """
+    if is_map_file(filename):
+        grid, battery, _ = open_map(filename)
+        return grid, battery
+
     with open(filename, 'r') as f:
         lines = [line.rstrip('\n') for line in f if line.strip()]
 
     battery = int(lines[0])
-    grid = [list(line) for line in lines[1:]]
+    grid = Grid.from_lines(lines[1:])
     return grid, battery
 
 
 def find_char(grid, ch):
     """Find all positions of a character in the grid."""
-    positions = []
-    for r, row in enumerate(grid):
-        for c, cell in enumerate(row):
-            if cell == ch:
-                positions.append((r, c))
-    return positions
+    return as_grid(grid).find(ch)
 
 
 def get_current_direction(cell):
@@ -47,7 +61,131 @@ def get_current_direction(cell):
     return current_map.get(cell, None)
 
 
-def find_escape_path(grid, battery):
+def current_offsets(grid):
+    """Map each cell code to the flat index delta its current forces, or 0."""
+    table = [0] * 256
+    for code in range(128):
+        direction = get_current_direction(chr(code))
+        if direction is not None:
+            table[code] = grid.offsets([direction])[0]
+    return table
+
+
+class CurrentChains:
+    """Forced current chains collapsed into macro edges.
+
+    Entering a current cell pushes the submarine on until it reaches still
+    water, so a whole chain of currents behaves as one edge. One pass over
+    the current cells follows every chain once, resolving each cell either
+    from the cell it pushes into or at the chain's terminal, so the
+    preprocessing is O(cells) in total.
+
+    Attributes:
+        drift: current_offsets(grid)
+        end: per-cell array; for a current cell, the flat index where a free
+             ride from it comes to rest, or -1 if it never does (it is pushed
+             into a wall or out of bounds, or around a current cycle)
+        span: per-cell array; for a current cell, the number of distinct
+              current cells on the ride from it, i.e. the cells where the
+              submarine may resist. A free ride enters span + 1 cells.
+        cycles: current cycles, each a list of flat indices; nothing caught
+                in one escapes without spending battery
+    """
+
+    def __init__(self, grid):
+        grid = as_grid(grid)
+        self.grid = grid
+        self.drift = drift = current_offsets(grid)
+        self.end = end = array('i', [-1]) * grid.size
+        self.span = span = array('i', [0]) * grid.size
+        self.cycles = []
+        cells = grid.cells
+
+        # state: 0 = unresolved, 1 = on the chain being followed, 2 = resolved
+        state = bytearray(grid.size)
+        for ch in '><^v':
+            for i in grid.find_indices(ch):
+                walk = []
+                n = i
+                while PASSABLE[cells[n]] and drift[cells[n]] and not state[n]:
+                    state[n] = 1
+                    walk.append(n)
+                    n += drift[cells[n]]
+                if not PASSABLE[cells[n]]:
+                    rest, base = -1, 0
+                elif not drift[cells[n]]:
+                    rest, base = n, 0
+                elif state[n] == 2:
+                    rest, base = end[n], span[n]
+                else:
+                    # the chain ran into itself: walk[k:] is a cycle
+                    k = walk.index(n)
+                    cycle = walk[k:]
+                    self.cycles.append(cycle)
+                    for m in cycle:
+                        span[m] = len(cycle)
+                        state[m] = 2
+                    del walk[k:]
+                    rest, base = -1, len(cycle)
+                for m in reversed(walk):
+                    base += 1
+                    end[m] = rest
+                    span[m] = base
+                    state[m] = 2
+
+    def ride(self, i, move, rest):
+        """Cells entered when moving from `i` in direction `move` (an index
+        into grid.offsets4) and coming to rest at `rest`."""
+        cells = self.grid.cells
+        n = i + self.grid.offsets4[move]
+        entered = [n]
+        while n != rest:
+            n += self.drift[cells[n]]
+            entered.append(n)
+        return entered
+
+
+def expand_moves(grid, i, battery_left, chains=None):
+    """Yield every move available from resting at cell `i`.
+
+    A move steps into a neighbor and then follows forced currents. At every
+    current cell along the way the submarine may instead resist (if it has
+    battery left) and come to rest there. Each current chain is taken as one
+    macro edge (see CurrentChains); use chains.ride() to list the cells it
+    enters.
+
+    Args:
+        grid: Grid
+        i: flat index of the resting cell
+        battery_left: remaining resists
+        chains: optional precomputed CurrentChains(grid)
+
+    Yields:
+        (move, rest, entered, battery_left): the direction (index into
+        grid.offsets4), the cell where the submarine comes to rest, the
+        number of cells entered and the battery left afterwards
+    """
+    cells = grid.cells
+    if chains is None:
+        chains = CurrentChains(grid)
+    drift, end, span = chains.drift, chains.end, chains.span
+    for move, o in enumerate(grid.offsets4):
+        n = i + o
+        code = cells[n]
+        if not PASSABLE[code]:
+            continue
+        if not drift[code]:
+            yield move, n, 1, battery_left
+            continue
+        if end[n] != -1:
+            yield move, end[n], span[n] + 1, battery_left
+        if battery_left:
+            for k in range(1, span[n] + 1):
+                yield move, n, k, battery_left - 1
+                n += drift[cells[n]]
+
+
+def find_escape_path(grid, battery, engine='bfs', chains=None, stats=None):
     """Find a path from 'S' to 'U' using at most `battery` current resists.
 
     Movement: 4-directional (up, down, left, right).
@@ -60,32 +198,283 @@ def find_escape_path(grid, battery):
     State: (row, col, battery_remaining)
 
     Args:
-        grid: list of lists of characters
+        grid: Grid or list of lists of characters
         battery: integer max resists
+        engine: key into ENGINES: 'bfs' (fewest moves), 'ida' (fewest
+                cells entered, iterative-deepening A*) or 'min_battery'
+                (fewest resists, then fewest cells entered; 0-1 BFS)
+        chains: optional prebuilt CurrentChains for this grid, so repeated
+                queries on the same cave share it
+        stats: optional dict; receives 'expanded' and 'peak_frontier' counts
 
     Returns:
         tuple: (path, battery_used) where path is list of (row, col) positions,
                or None if no path exists.
     """
-    # TODO: Implement your pathfinding algorithm here
-    # Hint: DFS or IDA* works well here due to the depth/resource constraint.
-    #   - State = (row, col, battery_remaining)
-    #   - DFS explores deep paths without high memory use
-    #   - IDA* (iterative deepening A*) combines depth limits with heuristic
-    #   - BFS may use too much memory on large grids with many battery levels
-    #
-    # When entering a current cell:
-    #   Option A: Resist the current (costs 1 battery), stay in the current cell
-    #   Option B: Go with the current (free), move to the next cell in current direction
-    #     - If next cell is wall/out of bounds, this move fails
-    #
-    # Useful variables:
-    #   start = find_char(grid, 'S')[0]
-    #   surface = find_char(grid, 'U')[0]
+    return ENGINES[engine](as_grid(grid), battery, chains=chains, stats=stats)
+
+
+def bfs_escape(grid, battery, chains=None, stats=None):
+    """Breadth-first search over (cell, battery_left) states.
+
+    Finds a path with the fewest moves (a move is one step plus any forced
+    drift) that stays within the battery limit. Same contract as
+    find_escape_path.
+    """
+    grid = as_grid(grid)
+    start = grid.find_indices('S')
+    if not start:
+        return None
+    start = (start[0], battery)
+
+    if chains is None:
+        chains = CurrentChains(grid)
+    cells = grid.cells
+    parent = {start: None}
+    queue = deque([start])
+    expanded = peak = 0
+    while queue:
+        if len(queue) > peak:
+            peak = len(queue)
+        state = queue.popleft()
+        expanded += 1
+        i, battery_left = state
+        if cells[i] == SURFACE:
+            record_stats(stats, expanded, peak)
+            return (grid.path(_unwind(chains, parent, state)), battery - battery_left)
+        for move, rest, _, left in expand_moves(grid, i, battery_left, chains):
+            nxt = (rest, left)
+            if nxt not in parent:
+                parent[nxt] = (state, move)
+                queue.append(nxt)
+
+    record_stats(stats, expanded, peak)
+    return None
+
+
+def _unwind(chains, parent, state):
+    """Expand the macro edges on the parent chain ending at `state`."""
+    segments = []
+    while parent[state] is not None:
+        prev, move = parent[state]
+        segments.append(chains.ride(prev[0], move, state[0]))
+        state = prev
+    path = [state[0]]
+    for entered in reversed(segments):
+        path.extend(entered)
+    return path
+
+
+def manhattan_heuristic(grid, goals):
+    """Return h(i): Manhattan distance from flat index i to the nearest goal.
+
+    Every cell entered moves the submarine one unit of Manhattan distance at
+    most, so h never overestimates the number of cells still to enter.
+    """
+    stride = grid.stride
+    targets = [divmod(g, stride) for g in goals]
+    if len(targets) == 1:
+        (gr, gc), = targets
+
+        def h(i):
+            r, c = divmod(i, stride)
+            return abs(r - gr) + abs(c - gc)
+    else:
+        def h(i):
+            r, c = divmod(i, stride)
+            return min(abs(r - gr) + abs(c - gc) for gr, gc in targets)
+    return h
+
+
+def ida_escape(grid, battery, chains=None, stats=None, table_size=TABLE_SIZE):
+    """Iterative-deepening A* over (cell, battery_left) states.
+
+    Finds a path entering the fewest cells within the battery limit, using
+    an admissible Manhattan-to-'U' heuristic. The depth-first search runs on
+    an explicit stack, so memory is the current path plus a transposition
+    table of at most `table_size` entries (least recently used entries are
+    evicted). Each table entry records the smallest number of cells entered
+    on reaching (cell, battery_left) and the iteration that set it. A visit
+    is pruned when an entry dominates it: the same cell with at least as much
+    battery left and fewer cells entered, or the same state already reached
+    with as few cells entered in this iteration. States on the current path
+    are skipped too, so current cycles never loop even after an eviction.
+
+    Same contract as find_escape_path.
+    """
+    grid = as_grid(grid)
+    start = grid.find_indices('S')
+    goals = grid.find_indices('U')
+    if not start or not goals:
+        return None
+    start = start[0]
+
+    h = manhattan_heuristic(grid, goals)
+    if chains is None:
+        chains = CurrentChains(grid)
+    cells = grid.cells
+    width = battery + 1
+    table = OrderedDict()
+
+    def children(i, battery_left, g):
+        # (f, cells entered, move, rest, battery left) for each move, best f last
+        moves = [(g + entered + h(rest), entered, move, rest, left)
+                 for move, rest, entered, left in expand_moves(grid, i, battery_left, chains)]
+        moves.sort(key=lambda move: -move[0])
+        return moves
+
+    def dominated(n, left, g):
+        key = n * width
+        for b in range(left, width):
+            entry = table.get(key + b)
+            if entry is not None:
+                best, stamp = entry
+                if best < g or (best == g and (b > left or stamp == iteration)):
+                    return True
+        return False
+
+    bound = h(start)
+    expanded = peak = 0
+    iteration = 0
+    while bound is not None:
+        iteration += 1
+        next_bound = None
+        on_path = {start * width + battery}
+        table[start * width + battery] = (0, iteration)
+        # frame: [cell, battery_left, g, move that got here, children]
+        frames = [[start, battery, 0, None, children(start, battery, 0)]]
+        expanded += 1
+        while frames:
+            if len(frames) > peak:
+                peak = len(frames)
+            frame = frames[-1]
+            moves = frame[4]
+            if not moves:
+                frames.pop()
+                on_path.discard(frame[0] * width + frame[1])
+                continue
+            f, entered, move, n, left = moves.pop()
+            if f > bound:
+                if next_bound is None or f < next_bound:
+                    next_bound = f
+                moves.clear()
+                continue
+            key = n * width + left
+            g = frame[2] + entered
+            if key in on_path or dominated(n, left, g):
+                continue
+            table[key] = (g, iteration)
+            table.move_to_end(key)
+            if len(table) > table_size:
+                table.popitem(last=False)
+            if cells[n] == SURFACE:
+                record_stats(stats, expanded, peak)
+                path = [start]
+                for prev, frame in zip(frames, frames[1:]):
+                    path.extend(chains.ride(prev[0], frame[3], frame[0]))
+                path.extend(chains.ride(frame[0], move, n))
+                return (grid.path(path), battery - left)
+            expanded += 1
+            on_path.add(key)
+            frames.append([n, left, g, move, children(n, left, g)])
+        bound = next_bound
+
+    record_stats(stats, expanded, peak)
+    return None
+
+
+def min_battery_escape(grid, battery=None, chains=None, stats=None):
+    """Layered 0-1 search for the escape that spends the fewest resists.
+
+    Free moves cost 0 battery and resists cost 1, so cells are settled in
+    layers of equal battery used: resist moves only ever feed the next
+    layer. Within a layer, cells are popped in order of cells entered (macro
+    edges have different lengths, so the layer is a binary heap rather than
+    a FIFO), which settles each cell once per layer and makes the first 'U'
+    popped optimal: least battery used, then fewest cells entered. Labels
+    live in flat per-cell arrays, so the search visits cells per layer
+    instead of every (cell, battery) state.
+
+    Args:
+        grid: Grid or list of lists of characters
+        battery: optional max resists; layers beyond it are not searched
+        chains: optional prebuilt CurrentChains
+        stats: optional dict; receives 'expanded' and 'peak_frontier' counts
+
+    Returns:
+        tuple: (path, battery_used) for the path with the least battery used
+               (ties broken by fewest cells entered), or None if 'U' cannot
+               be reached within `battery`.
+    """
+    grid = as_grid(grid)
+    start = grid.find_indices('S')
+    if not start:
+        return None
+    start = start[0]
+    if chains is None:
+        chains = CurrentChains(grid)
+
+    cells = grid.cells
+    size = grid.size
+    used = array('i', [-1]) * size
+    length = array('i', [0]) * size
+    parent = array('i', [-1]) * size
+    moves = bytearray(size)
+    used[start] = 0
+    parent[start] = start
 
+    layer = [(0, start)]
+    level = 0
+    expanded = peak = 0
+    while layer:
+        upcoming = []
+        spare = 1 if battery is None or level < battery else 0
+        while layer:
+            if len(layer) + len(upcoming) > peak:
+                peak = len(layer) + len(upcoming)
+            d, i = heappop(layer)
+            if used[i] != level or length[i] != d:
+                continue
+            expanded += 1
+            if cells[i] == SURFACE:
+                record_stats(stats, expanded, peak)
+                segments = []
+                while i != start:
+                    segments.append(chains.ride(parent[i], moves[i], i))
+                    i = parent[i]
+                path = [start]
+                for entered in reversed(segments):
+                    path.extend(entered)
+                return (grid.path(path), level)
+            for move, rest, entered, left in expand_moves(grid, i, spare, chains):
+                b = level + spare - left
+                nd = d + entered
+                seen = used[rest]
+                if seen != -1 and (seen < b or (seen == b and length[rest] <= nd)):
+                    continue
+                used[rest] = b
+                length[rest] = nd
+                parent[rest] = i
+                moves[rest] = move
+                if b == level:
+                    heappush(layer, (nd, rest))
+                else:
+                    upcoming.append((nd, rest))
+        level += 1
+        heapify(upcoming)
+        layer = upcoming
+
+    record_stats(stats, expanded, peak)
     return None
 
 
+ENGINES = {
+    'bfs': bfs_escape,
+    'ida': ida_escape,
+    'min_battery': min_battery_escape,
+}
+
+
 def main():
     if len(sys.argv) != 2:
         print("Usage: python problem5.py <data_file>")
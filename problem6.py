@@ -1,25 +1,51 @@
-import sys
+import argparse
+import hashlib
+import heapq
+import multiprocessing
+import struct
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+from grid import Grid, as_grid, load, passable_table, record_stats, trace_path
+from shortest_path import ENGINES, UNREACHED, dial, scaled_costs, unscale
+
+COST_MAP = {
+    '.': 1,
+    'C': 4,
+    'M': 2,
+    'P': 0.5,
+    'S': 1,
+    'O': 1,
+}
+# fixed-point cell costs: COSTS[code] == COST_MAP[char] * SCALE
+COSTS, SCALE = scaled_costs(COST_MAP)
+OUTPUT = passable_table('O')
+
+# Side length of the square clusters used by ClusterGraph.
+CLUSTER_SIZE = 16
+# Straight-crossing runs longer than this get an entrance at each end.
+ENTRANCE_RUN = 6
+# Number of landmarks behind ClusterGraph.lower_bound.
+BOUND_LANDMARKS = 4
+# Number of cluster graphs kept by cluster_graph.
+GRAPH_CACHE_SIZE = 4
+_graph_cache = OrderedDict()
+# Floorplan attached by each route_nets worker process (see _attach).
+_worker = {}
 
 
 def load_grid(filename):
     """Load the chip floorplan grid from a file.
 
     Returns:
-        grid: list of lists of characters
+        grid: Grid (see grid.py)
     """
-    with open(filename, 'r') as f:
-        grid = [list(line.rstrip('\n')) for line in f if line.strip()]
-    return grid
+    return load(filename)
 
 
 def find_char(grid, ch):
     """Find all positions of a character in the grid."""
-    positions = []
-    for r, row in enumerate(grid):
-        for c, cell in enumerate(row):
-            if cell == ch:
-                positions.append((r, c))
-    return positions
+    return as_grid(grid).find(ch)
 
 
 def get_cell_cost(cell):
@@ -32,18 +58,21 @@ def get_cell_cost(cell):
     'S', 'O' = input/output pin (cost 1)
     '#' = blocked macro (impassable, return None)
     """
-    cost_map = {
-        '.': 1,
-        'C': 4,
-        'M': 2,
-        'P': 0.5,
-        'S': 1,
-        'O': 1,
-    }
-    return cost_map.get(cell, None)
-
-
-def find_lowest_power_path(grid):
+    return COST_MAP.get(cell, None)
+
+
+def plan_digest(grid):
+    """Hash of the cost plane: identical for floorplans that differ only in
+    where 'S' and 'O' sit (they cost the same as '.')."""
+    grid = as_grid(grid)
+    table = bytes(COSTS[code] or 0 for code in range(256))
+    h = hashlib.blake2b(digest_size=32)
+    h.update(struct.pack('<II', grid.rows, grid.cols))
+    h.update(bytes(grid.cells[:grid.size]).translate(table))
+    return h.digest()
+
+
+def find_lowest_power_path(grid, engine='dial', stats=None):
     """Find the minimum power cost path from 'S' to 'O' across the chip.
 
     Movement: 8-directional (including diagonals).
@@ -51,33 +80,497 @@ def find_lowest_power_path(grid):
     '#' cells are blocked macros and cannot be routed through.
 
     Args:
-        grid: list of lists of characters
+        grid: Grid or list of lists of characters
+        engine: shortest-path engine, 'dial' or 'heap' (see shortest_path.py),
+                or 'hpa' for the cached hierarchical search (see
+                hierarchical_path), which is approximate
+        stats: optional dict; receives 'expanded' and 'peak_frontier' counts
 
     Returns:
         tuple: (total_cost, path) where path is list of (row, col) positions,
-               or None if no path exists.
+               or None if no path exists. With engine='hpa' the cost may
+               exceed the optimum and the tuple is (total_cost, path,
+               lower_bound) instead.
     """
-    # TODO: Implement your pathfinding algorithm here
-    # Hint: Dijkstra's algorithm is ideal since costs are non-negative and non-uniform.
-    #   - A* with heuristic (Euclidean distance * 0.5) can speed it up.
-    #   - BFS gives WRONG answers here because costs differ per cell.
-    #   - Greedy Best-First may find suboptimal paths.
-    #
-    # Useful variables:
-    #   start = find_char(grid, 'S')[0]
-    #   output = find_char(grid, 'O')[0]
-    #   8 directions: [(dr, dc) for dr in [-1,0,1] for dc in [-1,0,1] if not (dr==0 and dc==0)]
+    grid = as_grid(grid)
+    if engine == 'hpa':
+        return hierarchical_path(grid, stats=stats)
+    start = grid.find_indices('S')
+    if not start:
+        return None
+
+    dist, parent, output = ENGINES[engine](grid, start[:1], COSTS, grid.offsets8, goals=OUTPUT,
+                                            stats=stats)
+    if output is None:
+        return None
+    return (unscale(dist[output], SCALE), grid.path(trace_path(parent, output)))
+
+
+class ClusterGraph:
+    """HPA* abstraction of a floorplan (hierarchical pathfinding).
+
+    The floorplan is cut into `size` x `size` clusters. Along every border
+    between two neighboring clusters, each run of rows (or columns) that
+    can be crossed straight gets an entrance in its middle, or one at each
+    end when it is longer than ENTRANCE_RUN; diagonal-only crossings (a
+    step that squeezes between two blocked cells, also at cluster corners)
+    get an entrance of their own, so the abstraction connects exactly the
+    cells the grid connects. The two cells of an entrance become abstract
+    nodes joined by the crossing step, and the nodes of each cluster are
+    joined by their exact in-cluster costs (get_cell_cost weights,
+    8-connected), computed once per cluster with a bucket-queue Dijkstra.
+    Only cell costs matter, so one graph serves every floorplan with the
+    same cost plane wherever its pins sit.
+
+    Attributes:
+        size: cluster side length
+        cluster_rows, cluster_cols: number of clusters down and across
+        nodes: full-grid flat index of each abstract node
+        node_of: {flat index: node id}
+        cluster_nodes: per cluster, ids of its nodes
+        edges: per node, list of (node, cost) in fixed-point units (see
+               COSTS)
+        landmarks: flat indices of the landmarks behind lower_bound (empty
+                   until it is first called)
+    """
+
+    def __init__(self, grid, size=CLUSTER_SIZE):
+        grid = as_grid(grid)
+        self.grid = grid
+        self.size = size
+        self.cluster_rows = -(-grid.rows // size)
+        self.cluster_cols = -(-grid.cols // size)
+        self.nodes = []
+        self.node_of = {}
+        self.cluster_nodes = [[] for _ in range(self.cluster_rows * self.cluster_cols)]
+        self.edges = []
+        self.landmarks = []
+        self._subgrids = {}
+        self._landmark_tables = None
+
+        index = grid.index
+        for band in range(self.cluster_rows):
+            rows = range(band * size, min((band + 1) * size, grid.rows))
+            for c in range(size, grid.cols, size):
+                self._connect([(index(r, c - 1), index(r, c)) for r in rows])
+        for band in range(self.cluster_cols):
+            cols = range(band * size, min((band + 1) * size, grid.cols))
+            for r in range(size, grid.rows, size):
+                self._connect([(index(r - 1, c), index(r, c)) for c in cols])
+        for r in range(size, grid.rows, size):
+            for c in range(size, grid.cols, size):
+                self._connect([(index(r - 1, c - 1), index(r - 1, c)),
+                               (index(r, c - 1), index(r, c))], straight=False)
+
+        for k, ids in enumerate(self.cluster_nodes):
+            if len(ids) < 2:
+                continue
+            sub, r0, c0 = self.cluster(k)
+            for u in ids:
+                dist, _, _ = dial(sub, [self.to_local(k, self.nodes[u])], COSTS, sub.offsets8)
+                for v in ids:
+                    d = dist[self.to_local(k, self.nodes[v])]
+                    if v != u and d < UNREACHED:
+                        self.edges[u].append((v, d))
+
+    def _node(self, i):
+        node = self.node_of.get(i)
+        if node is None:
+            node = self.node_of[i] = len(self.nodes)
+            self.nodes.append(i)
+            self.edges.append([])
+            self.cluster_nodes[self.cluster_of(i)].append(node)
+        return node
+
+    def _link(self, i, j):
+        """Add the entrance made of the crossing step between cells i and j."""
+        cells = self.grid.cells
+        a, b = self._node(i), self._node(j)
+        self.edges[a].append((b, COSTS[cells[j]]))
+        self.edges[b].append((a, COSTS[cells[i]]))
 
-    return None
+    def _connect(self, along, straight=True):
+        """Place entrances along one cluster border.
+
+        Args:
+            along: consecutive (inner, outer) flat index pairs facing each
+                   other across the border
+            straight: also place entrances on runs of straight crossings
+                      (False for the 2x2 block at a cluster corner, where
+                      only the diagonal squeezes cross between clusters)
+        """
+        cells = self.grid.cells
+        open_ = [(COSTS[cells[i]] is not None, COSTS[cells[j]] is not None) for i, j in along]
+        if straight:
+            t = 0
+            while t < len(along):
+                if not all(open_[t]):
+                    t += 1
+                    continue
+                end = t
+                while end + 1 < len(along) and all(open_[end + 1]):
+                    end += 1
+                picks = [(t + end) // 2] if end - t < ENTRANCE_RUN else [t, end]
+                for p in picks:
+                    self._link(*along[p])
+                t = end + 1
+        for t in range(len(along) - 1):
+            (i0, j0), (i1, j1) = along[t], along[t + 1]
+            (a0, b0), (a1, b1) = open_[t], open_[t + 1]
+            if a0 and b1 and not b0 and not a1:
+                self._link(i0, j1)
+            if a1 and b0 and not a0 and not b1:
+                self._link(i1, j0)
+
+    def cluster(self, k):
+        """Return (sub_grid, first row, first col) of cluster `k`.
+
+        The sub-grid is a padded copy of the cluster's cells, so searches on
+        it cannot leave the cluster.
+        """
+        sub = self._subgrids.get(k)
+        cr, cc = divmod(k, self.cluster_cols)
+        r0, c0 = cr * self.size, cc * self.size
+        if sub is None:
+            grid = self.grid
+            h = min(self.size, grid.rows - r0)
+            w = min(self.size, grid.cols - c0)
+            sub = Grid(h, w, bytearray((h + 2) * (w + 2)))
+            for r in range(h):
+                start = grid.index(r0 + r, c0)
+                sub.cells[sub.index(r, 0):sub.index(r, w)] = grid.cells[start:start + w]
+            self._subgrids[k] = sub
+        return sub, r0, c0
+
+    def cluster_of(self, i):
+        """Cluster holding flat index `i` of the full grid."""
+        r, c = divmod(i, self.grid.stride)
+        return (r - 1) // self.size * self.cluster_cols + (c - 1) // self.size
+
+    def to_local(self, k, i):
+        """Flat index in cluster `k`'s sub-grid of full-grid index `i`."""
+        sub, r0, c0 = self.cluster(k)
+        r, c = self.grid.position(i)
+        return sub.index(r - r0, c - c0)
+
+    def corridor(self, clusters, grid=None):
+        """Copy of the floorplan keeping only the cells of `clusters`.
+
+        Every other cell becomes BORDER (impassable), so a search on the copy
+        stays inside the corridor. `grid` selects the floorplan to copy (by
+        default the one the graph was built from), so pins placed on the
+        same cost plane come along.
+        """
+        if grid is None:
+            grid = self.grid
+        cells = bytearray(grid.size)
+        for k in clusters:
+            sub, r0, c0 = self.cluster(k)
+            for r in range(r0, r0 + sub.rows):
+                start = grid.index(r, c0)
+                cells[start:start + sub.cols] = grid.cells[start:start + sub.cols]
+        return Grid(grid.rows, grid.cols, cells)
+
+    def lower_bound(self, start, outputs):
+        """Fixed-point cost no route from `start` to any of `outputs` can beat.
+
+        On first use BOUND_LANDMARKS landmarks are picked by farthest-point
+        selection and exact costs from and to each are tabulated over the
+        whole floorplan. For a landmark L, cost(s, o) >= cost(L, o) -
+        cost(L, s) and cost(s, o) >= cost(s, L) - cost(o, L) (triangle
+        inequality); the bound is the best of those and of the cheapest cell
+        cost times the Chebyshev distance, minimized over the outputs.
+        """
+        tables = self._landmarks_built()
+        stride = self.grid.stride
+        cheapest = min(c for c in COSTS if c is not None)
+        sr, sc = divmod(start, stride)
+        bound = UNREACHED
+        for o in outputs:
+            r, c = divmod(o, stride)
+            best = cheapest * max(abs(r - sr), abs(c - sc))
+            for fwd, rev in tables:
+                if fwd[start] < UNREACHED and fwd[o] < UNREACHED:
+                    best = max(best, fwd[o] - fwd[start])
+                if rev[start] < UNREACHED and rev[o] < UNREACHED:
+                    best = max(best, rev[start] - rev[o])
+            bound = min(bound, best)
+        return bound
+
+    def _landmarks_built(self):
+        """Build (on first call) and return per-landmark (from, to) costs."""
+        if self._landmark_tables is not None:
+            return self._landmark_tables
+        grid = self.grid
+        offsets = grid.offsets8
+        seed = next((i for i in range(grid.size) if COSTS[grid.cells[i]] is not None), None)
+        tables = []
+        if seed is not None:
+            nearest = dial(grid, [seed], COSTS, offsets)[0]
+            for _ in range(BOUND_LANDMARKS):
+                landmark = max(range(grid.size),
+                               key=lambda i: nearest[i] if nearest[i] < UNREACHED else -1)
+                if not 0 < nearest[landmark] < UNREACHED:
+                    break
+                fwd = dial(grid, [landmark], COSTS, offsets)[0]
+                rev = dial(grid, [landmark], COSTS, offsets, reverse=True)[0]
+                for i in range(grid.size):
+                    if fwd[i] < UNREACHED and rev[i] < UNREACHED:
+                        if not tables or fwd[i] + rev[i] < nearest[i]:
+                            nearest[i] = fwd[i] + rev[i]
+                    elif not tables:
+                        nearest[i] = UNREACHED
+                nearest[landmark] = 0
+                self.landmarks.append(landmark)
+                tables.append((fwd, rev))
+        self._landmark_tables = tables
+        return tables
+
+
+def cluster_graph(grid):
+    """The ClusterGraph for a floorplan, cached per map content.
+
+    Graphs are keyed by plan_digest and evicted least recently used first,
+    so repeated route queries on one floorplan build the abstraction once,
+    even when the pins move between queries.
+    """
+    grid = as_grid(grid)
+    key = plan_digest(grid)
+    if key in _graph_cache:
+        _graph_cache.move_to_end(key)
+        return _graph_cache[key]
+    graph = ClusterGraph(grid)
+    _graph_cache[key] = graph
+    if len(_graph_cache) > GRAPH_CACHE_SIZE:
+        _graph_cache.popitem(last=False)
+    return graph
+
+
+def hierarchical_path(grid, graph=None, stats=None):
+    """find_lowest_power_path on a cached HPA* abstraction.
+
+    'S' and 'O' are linked to the entrances of their clusters by in-cluster
+    Dijkstra runs and the route is found by A* on the abstract graph. It is
+    then refined by an exact search confined to the clusters that route
+    passes through, which also drops the detours through entrance cells, so
+    the returned cost is the exact cost of the returned path.
+
+    The result is approximate: the best route may leave those clusters, so
+    the cost can exceed the optimum of the whole floorplan. Every result
+    therefore carries a lower bound, a cost no route can beat (see
+    ClusterGraph.lower_bound); the optimum lies between the two.
+
+    Args:
+        grid: Grid or list of lists of characters
+        graph: optional ClusterGraph for this floorplan (default: cached
+               cluster_graph(grid))
+        stats: optional dict; receives 'expanded' and 'peak_frontier'
+               (abstract and refining searches) and 'lower_bound'
+
+    Returns:
+        tuple: (total_cost, path, lower_bound), where total_cost and path
+               are as returned by find_lowest_power_path, or None if no path
+               exists
+    """
+    grid = as_grid(grid)
+    start = grid.find_indices('S')
+    outputs = grid.find_indices('O')
+    if not start or not outputs:
+        return None
+    start = start[0]
+    if graph is None:
+        graph = cluster_graph(grid)
+
+    stride = grid.stride
+    cheapest = min(c for c in COSTS if c is not None)
+    targets = [divmod(o, stride) for o in outputs]
+
+    def heuristic(i):
+        r, c = divmod(i, stride)
+        return cheapest * min(max(abs(r - tr), abs(c - tc)) for tr, tc in targets)
+
+    # Virtual abstract nodes: START (edges to its cluster's nodes) and GOAL
+    # (edges from every node in a cluster holding an 'O').
+    nodes = graph.nodes
+    start_node, goal_node = len(nodes), len(nodes) + 1
+    k = graph.cluster_of(start)
+    sub = graph.cluster(k)[0]
+    dist, _, _ = dial(sub, [graph.to_local(k, start)], COSTS, sub.offsets8)
+    start_edges = [(v, dist[graph.to_local(k, nodes[v])]) for v in graph.cluster_nodes[k]
+                   if dist[graph.to_local(k, nodes[v])] < UNREACHED]
+    exits = {}
+    for o in outputs:
+        ko = graph.cluster_of(o)
+        if ko == k and dist[graph.to_local(k, o)] < UNREACHED:
+            start_edges.append((goal_node, dist[graph.to_local(k, o)]))
+        sub_o = graph.cluster(ko)[0]
+        to_o, _, _ = dial(sub_o, [graph.to_local(ko, o)], COSTS, sub_o.offsets8, reverse=True)
+        for v in graph.cluster_nodes[ko]:
+            d = to_o[graph.to_local(ko, nodes[v])]
+            if d < exits.get(v, (UNREACHED,))[0]:
+                exits[v] = (d, o)
+
+    edges = graph.edges + [start_edges, []]
+    for v, (w, _) in exits.items():
+        edges[v] = edges[v] + [(goal_node, w)]
+    guess = [heuristic(i) for i in nodes] + [0, 0]
+    best = [UNREACHED] * len(edges)
+    parent = [None] * len(edges)
+    best[start_node] = 0
+    heap = [(heuristic(start), 0, start_node)]
+    expanded = peak = 0
+    while heap:
+        if len(heap) > peak:
+            peak = len(heap)
+        _, d, u = heapq.heappop(heap)
+        if d != best[u]:
+            continue
+        expanded += 1
+        if u == goal_node:
+            break
+        for v, w in edges[u]:
+            nd = d + w
+            if nd < best[v]:
+                best[v] = nd
+                parent[v] = u
+                heapq.heappush(heap, (nd + guess[v], nd, v))
+    record_stats(stats, expanded, peak)
+    if best[goal_node] == UNREACHED:
+        return None
+
+    corridor = {graph.cluster_of(start)}
+    u = parent[goal_node]
+    if u != start_node:
+        corridor.add(graph.cluster_of(exits[u][1]))
+    while u != start_node:
+        corridor.add(graph.cluster_of(nodes[u]))
+        u = parent[u]
+    lane = graph.corridor(corridor, grid)
+    dist, route, output = dial(lane, [start], COSTS, lane.offsets8, goals=OUTPUT, stats=stats)
+    bound = unscale(graph.lower_bound(start, outputs), SCALE)
+    if stats is not None:
+        stats['lower_bound'] = bound
+    return (unscale(dist[output], SCALE), grid.path(trace_path(route, output)), bound)
+
+
+def read_netlist(filename):
+    """Load a netlist: one net per non-blank line, '#' starts a comment.
+
+    A line is `source_row source_col target_row target_col`, optionally
+    preceded by a net name (default: the net's 0-based position).
+
+    Returns:
+        list of (name, (row, col), (row, col)) tuples
+    """
+    nets = []
+    with open(filename, 'r') as f:
+        for line in f:
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            name = fields.pop(0) if len(fields) == 5 else str(len(nets))
+            if len(fields) != 4:
+                raise ValueError(f'{filename}: bad net line {line.strip()!r}')
+            sr, sc, tr, tc = map(int, fields)
+            nets.append((name, (sr, sc), (tr, tc)))
+    return nets
+
+
+def route_net(grid, source, target, engine='dial', stats=None):
+    """Minimum power cost route between two given cells (one net).
+
+    Same cost model as find_lowest_power_path, but the pins are explicit
+    (row, col) positions instead of the 'S' and 'O' cells.
+
+    Returns:
+        tuple: (total_cost, path), or None if either pin is blocked or out of
+               the grid, or no route exists
+    """
+    grid = as_grid(grid)
+    ends = []
+    for r, c in (source, target):
+        if not (0 <= r < grid.rows and 0 <= c < grid.cols) or COSTS[grid.cells[grid.index(r, c)]] is None:
+            return None
+        ends.append(grid.index(r, c))
+    dist, parent, reached = ENGINES[engine](grid, ends[:1], COSTS, grid.offsets8, stats=stats,
+                                            target=ends[1])
+    if reached is None:
+        return None
+    return (unscale(dist[reached], SCALE), grid.path(trace_path(parent, reached)))
+
+
+def _attach(name, rows, cols):
+    """Pool initializer: map the shared floorplan into this worker."""
+    shm = shared_memory.SharedMemory(name=name)
+    _worker['shm'] = shm
+    _worker['grid'] = Grid(rows, cols, shm.buf)
+
+
+def _route_task(task):
+    k, source, target, engine = task
+    return k, route_net(_worker['grid'], source, target, engine)
+
+
+def route_nets(grid, nets, workers=None, engine='dial', chunksize=None):
+    """Route many nets on a process pool, yielding results as they finish.
+
+    The padded cell plane is copied once into a shared memory block; every
+    worker attaches to it at startup and builds its Grid on the shared
+    buffer, so the floorplan is never re-parsed or pickled per worker or
+    per net. Only pin positions go out and (cost, path) results come back.
+
+    Args:
+        grid: Grid or list of lists of characters
+        nets: sequence of (source, target) (row, col) pairs
+        workers: number of processes (default: os.cpu_count()); 1 routes
+                 in this process without a pool
+        engine: shortest-path engine, 'dial' or 'heap'
+        chunksize: nets handed to a worker at a time (default: enough for
+                   about eight chunks per worker)
+
+    Yields:
+        (k, result) in completion order, where k indexes `nets` and result
+        is as returned by route_net
+    """
+    grid = as_grid(grid)
+    nets = list(nets)
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1:
+        for k, (source, target) in enumerate(nets):
+            yield k, route_net(grid, source, target, engine)
+        return
+    if chunksize is None:
+        chunksize = max(1, len(nets) // (workers * 8))
+
+    shm = shared_memory.SharedMemory(create=True, size=grid.size)
+    try:
+        shm.buf[:grid.size] = grid.cells[:grid.size]
+        with multiprocessing.Pool(workers, _attach, (shm.name, grid.rows, grid.cols)) as pool:
+            tasks = ((k, source, target, engine) for k, (source, target) in enumerate(nets))
+            yield from pool.imap_unordered(_route_task, tasks, chunksize)
+    finally:
+        shm.close()
+        shm.unlink()
 
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python problem6.py <grid_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Route minimum power paths on a chip floorplan.')
+    parser.add_argument('grid_file', help='floorplan map (text or compiled .pfm)')
+    parser.add_argument('--nets', help='netlist file; routes every net instead of S -> O')
+    parser.add_argument('--workers', type=int, help='processes for --nets (default: all cores)')
+    args = parser.parse_args()
+
+    grid = load_grid(args.grid_file)
 
-    filename = sys.argv[1]
-    grid = load_grid(filename)
+    if args.nets:
+        nets = read_netlist(args.nets)
+        for k, result in route_nets(grid, [(s, t) for _, s, t in nets], args.workers):
+            name = nets[k][0]
+            if result is None:
+                print(f"{name}: no route", flush=True)
+            else:
+                print(f"{name}: {result[0]} {result[1]}", flush=True)
+        return
 
     print(f"Grid size: {len(grid)} x {len(grid[0])}")
     print(f"Input pin: {find_char(grid, 'S')}")
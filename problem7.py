@@ -1,25 +1,37 @@
+import hashlib
 import sys
+from collections import OrderedDict
+
+from grid import as_grid, load, passable_table, trace_path
+from shortest_path import ENGINES, dial, scaled_costs, unscale
+
+COST_MAP = {
+    '.': 1,
+    'F': 5,
+    'S': 1,
+    'H': 1,
+}
+# fixed-point cell costs: COSTS[code] == COST_MAP[char] * SCALE
+COSTS, SCALE = scaled_costs(COST_MAP)
+SHELTERS = passable_table('H')
+
+# Number of shelter distance fields kept by shelter_distance_field.
+FIELD_CACHE_SIZE = 8
+_field_cache = OrderedDict()
 
 
 def load_grid(filename):
     """Load the grid from a file.
 
     Returns:
-        grid: list of lists of characters
+        grid: Grid (see grid.py)
     """
-    with open(filename, 'r') as f:
-        grid = [list(line.rstrip('\n')) for line in f if line.strip()]
-    return grid
+    return load(filename)
 
 
 def find_char(grid, ch):
     """Find all positions of a character in the grid."""
-    positions = []
-    for r, row in enumerate(grid):
-        for c, cell in enumerate(row):
-            if cell == ch:
-                positions.append((r, c))
-    return positions
+    return as_grid(grid).find(ch)
 
 
 def get_cell_cost(cell):
@@ -30,16 +42,10 @@ def get_cell_cost(cell):
     'S', 'H' = treated as clear path (cost 1)
     '#' = impassable (return None)
     """
-    cost_map = {
-        '.': 1,
-        'F': 5,
-        'S': 1,
-        'H': 1,
-    }
-    return cost_map.get(cell, None)
+    return COST_MAP.get(cell, None)
 
 
-def find_nearest_shelter(grid):
+def find_nearest_shelter(grid, engine='dial', stats=None):
     """Find the minimum-cost path from 'S' to the nearest 'H' (shelter).
 
     Movement: 4-directional (up, down, left, right). No diagonals.
@@ -47,28 +53,89 @@ def find_nearest_shelter(grid):
     Multiple shelters 'H' may exist — find the one with lowest total cost.
 
     Args:
-        grid: list of lists of characters
+        grid: Grid or list of lists of characters
+        engine: shortest-path engine, 'dial' or 'heap' (see shortest_path.py)
+        stats: optional dict; receives 'expanded' and 'peak_frontier' counts
 
     Returns:
         tuple: (total_cost, path) where path is list of (row, col) positions
                from S to the nearest H, or None if no shelter is reachable.
     """
-    # TODO: Implement your pathfinding algorithm here
-    # Hint: Dijkstra finds the true minimum-cost path with non-uniform weights.
-    #   - BFS gives WRONG answers because fog costs more than clear path.
-    #   - A* with Manhattan distance heuristic (x min cost 1) is admissible and fast.
-    #   - Greedy may avoid fog too aggressively and take long detours.
-    #
-    # Since there are multiple shelters, you can either:
-    #   1. Run Dijkstra from S and stop when you first reach ANY 'H'
-    #   2. Run Dijkstra from S to all cells, then pick the cheapest 'H'
-    #
-    # Useful variables:
-    #   start = find_char(grid, 'S')[0]
-    #   shelters = find_char(grid, 'H')
-    #   4 directions: [(-1,0), (1,0), (0,-1), (0,1)]
-
-    return None
+    grid = as_grid(grid)
+    start = grid.find_indices('S')
+    if not start:
+        return None
+
+    dist, parent, shelter = ENGINES[engine](grid, start[:1], COSTS, grid.offsets4, goals=SHELTERS,
+                                             stats=stats)
+    if shelter is None:
+        return None
+    return (unscale(dist[shelter], SCALE), grid.path(trace_path(parent, shelter)))
+
+
+def shelter_distance_field(grid):
+    """Cost-to-nearest-shelter for every cell, from one reverse multi-source Dijkstra.
+
+    All 'H' cells are seeded at distance 0 and the search runs backwards:
+    stepping from u into v costs get_cell_cost(v), so popping v relaxes each
+    neighbor u with dist[v] + cost(v). Fields are cached per map content
+    (rows, cols and a hash of the cell buffer) with LRU eviction, so every
+    hiker on the same fog map shares one field.
+
+    Args:
+        grid: Grid or list of lists of characters
+
+    Returns:
+        (dist, next_hop): per-cell arrays indexed by flat cell index. dist[i]
+        is the minimum cost from i to any shelter in fixed-point units
+        (divide by SCALE; shortest_path.UNREACHED if none is reachable);
+        next_hop[i] is the next cell on that path (a shelter is its own
+        next hop, unreachable cells hold -1).
+    """
+    grid = as_grid(grid)
+    key = (grid.rows, grid.cols, hashlib.blake2b(memoryview(grid.cells)[:grid.size]).digest())
+    if key in _field_cache:
+        _field_cache.move_to_end(key)
+        return _field_cache[key]
+
+    dist, next_hop, _ = dial(grid, grid.find_indices('H'), COSTS, grid.offsets4, reverse=True)
+    _field_cache[key] = (dist, next_hop)
+    if len(_field_cache) > FIELD_CACHE_SIZE:
+        _field_cache.popitem(last=False)
+    return dist, next_hop
+
+
+def find_nearest_shelters(grid, starts):
+    """Answer find_nearest_shelter for many starting positions on one map.
+
+    Uses the cached shelter_distance_field, so each start costs only a walk
+    along next hops (O(path length)) after the field is built once.
+
+    Args:
+        grid: Grid or list of lists of characters
+        starts: list of (row, col) starting positions
+
+    Returns:
+        list with one entry per start: (total_cost, path) as returned by
+        find_nearest_shelter, or None if no shelter is reachable from it
+    """
+    grid = as_grid(grid)
+    dist, next_hop = shelter_distance_field(grid)
+    results = []
+    for r, c in starts:
+        if not (0 <= r < grid.rows and 0 <= c < grid.cols):
+            results.append(None)
+            continue
+        i = grid.index(r, c)
+        if next_hop[i] == -1:
+            results.append(None)
+            continue
+        path = [i]
+        while next_hop[i] != i:
+            i = next_hop[i]
+            path.append(i)
+        results.append((unscale(dist[path[0]], SCALE), grid.path(path)))
+    return results
 
 
 def main():
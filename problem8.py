@@ -1,28 +1,75 @@
 import sys
 
+from bitrows import any_hit, flood, positions_to_rows, row_masks, rows_to_mask
+from grid import as_grid, load, passable_table, record_stats
+
+PASSABLE = passable_table('SE.s')
+EXIT = ord('E')
+UNSTABLE = ord('s')
+
+# Largest visited table (padded cells * 2**stones bytes) kept as a flat
+# bytearray; larger state spaces are stored sparsely in a dict.
+MAX_DENSE_STATES = 1 << 24
+
+# Most (cell, used stones) states a crossing search may store before it
+# gives up.
+MAX_STATES = 1 << 21
+
 
 def load_grid(filename):
     """Load the river crossing grid from a file.
 
     Returns:
-        grid: list of lists of characters
+        grid: Grid (see grid.py)
     """
-    with open(filename, 'r') as f:
-        grid = [list(line.rstrip('\n')) for line in f if line.strip()]
-    return grid
+    return load(filename)
 
 
 def find_char(grid, ch):
     """Find all positions of a character in the grid."""
-    positions = []
-    for r, row in enumerate(grid):
-        for c, cell in enumerate(row):
-            if cell == ch:
-                positions.append((r, c))
-    return positions
+    return as_grid(grid).find(ch)
+
+
+def crossing_region(grid):
+    """Position-only reachability pass with every unstable stone usable.
+
+    One bit-parallel flood fill from the whole west bank and one from the
+    whole east bank (8-connected, O(cells) big-integer work in total).
+    Their intersection holds every cell that lies on some S -> E route.
+
+    Returns:
+        per-row bitsets of that region, or None if no 'E' is reachable
+        from any 'S' (the river cannot be crossed at all)
+    """
+    grid = as_grid(grid)
+    masks = row_masks(grid, PASSABLE)
+    from_start = flood(masks, positions_to_rows(grid.find('S'), grid.rows), grid.cols, True)
+    if not any_hit(from_start, grid.find('E')):
+        return None
+    from_exit = flood(masks, positions_to_rows(grid.find('E'), grid.rows), grid.cols, True)
+    return [a & b for a, b in zip(from_start, from_exit)]
+
 
+def useful_stones(grid, region=None):
+    """Flat indices of the unstable stones that can lie on some S -> E path.
 
-def find_crossing_path(grid):
+    A stone qualifies when it is in the crossing region (see
+    crossing_region). Any other stone is off every crossing and can be
+    treated as water.
+    """
+    grid = as_grid(grid)
+    if region is None:
+        region = crossing_region(grid) or [0] * grid.rows
+    useful = []
+    for i in grid.find_indices('s'):
+        r, c = grid.position(i)
+        if region[r] >> c & 1:
+            useful.append(i)
+    return useful
+
+
+def find_crossing_path(grid, stats=None, max_dense_states=MAX_DENSE_STATES,
+                       max_states=MAX_STATES):
     """Find the shortest path (fewest steps) from any 'S' cell to any 'E' cell,
     respecting unstable stone rules.
 
@@ -36,33 +83,138 @@ def find_crossing_path(grid):
         '~' = deep water (impassable)
         '#' = boulder (impassable)
 
-    State: (row, col, frozenset_of_used_unstable_stones)
-    Since 's' cells are few (typically 3-8), the state space is manageable.
+    A position-only pass (crossing_region) runs first. It rejects rivers
+    with no crossing before any search state is built, and it confines
+    the search to cells that lie on some S -> E route. The search is then
+    a layered BFS. Every 'S' is seeded at distance 0 in one frontier, and
+    the search stops at the first layer that touches any 'E'.
+
+    State: (cell, set of used unstable stones), packed into one integer
+    (cell << k) | mask. Each of the k stones in the region owns one bit
+    of the mask. When cells * 2**k fits in `max_dense_states`, visited
+    states live in a flat bytearray indexed by the packed state. Otherwise
+    a dict keyed by it holds only the states actually reached. Each entry
+    stores the move that first reached the state, which is enough to walk
+    the path back.
+
+    A state is also skipped when the same cell was already reached, no
+    later, with a subset of its used stones: every continuation of the
+    new state is open to the old one too. Each cell keeps the minimal
+    masks it was reached with for this check.
 
     Args:
-        grid: list of lists of characters
+        grid: Grid or list of lists of characters
+        stats: optional dict; receives 'expanded' and 'peak_frontier' counts
+        max_dense_states: largest state space kept as a flat bytearray
+        max_states: most states stored before the search gives up
 
     Returns:
         tuple: (num_steps, path) where path is list of (row, col) positions,
                or None if no crossing is possible.
-    """
-    # TODO: Implement your pathfinding algorithm here
-    # Hint: BFS with extended state (position + set of used unstable stones).
-    #   - State = (row, col, frozenset of used 's' positions)
-    #   - When you step on an 's', add it to the used set
-    #   - You cannot step on an 's' that's already in your used set
-    #   - BFS guarantees shortest path in steps
-    #   - A* with heuristic can speed things up on larger grids
-    #
-    # Useful variables:
-    #   starts = find_char(grid, 'S')  # multiple start cells (west bank)
-    #   exits = find_char(grid, 'E')   # multiple exit cells (east bank)
-    #   unstable = set(find_char(grid, 's'))
-    #   8 directions: [(dr, dc) for dr in [-1,0,1] for dc in [-1,0,1] if not (dr==0 and dc==0)]
 
+    Raises:
+        RuntimeError: if the search stores more than `max_states` states
+    """
+    grid = as_grid(grid)
+    region = crossing_region(grid)
+    if region is None:
+        record_stats(stats, 0, 0)
+        return None
+
+    cells = grid.cells
+    offsets = grid.offsets8
+    allowed = rows_to_mask(grid, region)
+    stones = useful_stones(grid, region)
+    bits = {i: 1 << b for b, i in enumerate(stones)}
+    k = len(stones)
+    full = (1 << k) - 1
+
+    # seen[state] holds 1 + the index in `offsets` of the move that first
+    # reached the state, ROOT for a start state and 0 (or no key) if unseen
+    if grid.size << k <= max_dense_states:
+        seen = bytearray(grid.size << k)
+        known = seen.__getitem__
+    else:
+        seen = {}
+        known = seen.__contains__
+    root = len(offsets) + 1
+    # minimal[i]: the used-stone masks cell i was reached with, none of
+    # which contains another
+    minimal = {}
+
+    frontier = []
+    for i in grid.find_indices('S'):
+        if allowed[i]:
+            seen[i << k] = root
+            minimal[i] = [0]
+            frontier.append(i << k)
+
+    stored = len(frontier)
+    expanded = peak = 0
+    while frontier:
+        expanded += len(frontier)
+        if len(frontier) > peak:
+            peak = len(frontier)
+        next_frontier = []
+        for state in frontier:
+            i = state >> k
+            used = state & full
+            for move, o in enumerate(offsets, 1):
+                n = i + o
+                if not allowed[n]:
+                    continue
+                code = cells[n]
+                if code == UNSTABLE:
+                    bit = bits[n]
+                    if used & bit:
+                        continue
+                    mask = used | bit
+                else:
+                    mask = used
+                nxt = n << k | mask
+                if known(nxt):
+                    continue
+                masks = minimal.get(n)
+                if masks is None:
+                    minimal[n] = [mask]
+                else:
+                    if not all(m & ~mask for m in masks):
+                        continue
+                    masks[:] = [m for m in masks if m & mask != mask]
+                    masks.append(mask)
+                stored += 1
+                if stored > max_states:
+                    record_stats(stats, expanded, peak)
+                    raise RuntimeError(f'crossing search exceeded {max_states} states')
+                seen[nxt] = move
+                if code == EXIT:
+                    record_stats(stats, expanded, peak)
+                    return _trace(grid, seen, root, nxt, k, bits)
+                next_frontier.append(nxt)
+        frontier = next_frontier
+
+    record_stats(stats, expanded, peak)
     return None
 
 
+def _trace(grid, seen, root, state, k, bits):
+    """Walk the stored moves back from `state` to a start state."""
+    cells = grid.cells
+    offsets = grid.offsets8
+    full = (1 << k) - 1
+    i = state >> k
+    path = [i]
+    while seen[state] != root:
+        used = state & full
+        if cells[i] == UNSTABLE:
+            used &= ~bits[i]
+        i -= offsets[seen[state] - 1]
+        state = i << k | used
+        path.append(i)
+    path.reverse()
+    return (len(path) - 1, grid.path(path))
+
+
 def main():
     if len(sys.argv) != 2:
         print("Usage: python problem8.py <grid_file>")
@@ -78,7 +230,11 @@ def main():
     print(f"Unstable stones: {find_char(grid, 's')}")
     print()
 
-    result = find_crossing_path(grid)
+    try:
+        result = find_crossing_path(grid)
+    except RuntimeError as error:
+        print(f"Search stopped: {error}")
+        sys.exit(1)
 
     if result is None:
         print("No crossing path found!")
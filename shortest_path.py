@@ -0,0 +1,189 @@
+"""Shared shortest-path engines for the small fixed cost alphabets.
+
+Problems 2, 6 and 7 only use a handful of cell costs ({0.5, 1, 3},
+{0.5, 1, 2, 4} and {1, 5}). scaled_costs() turns such a cost map into exact
+fixed-point integers, and dial() runs Dijkstra on them with a circular
+bucket queue (Dial's algorithm): with integer edge costs in 1..C, every
+tentative distance lies within C of the current one, so C + 1 buckets
+replace the binary heap and each push/pop is O(1).
+
+heap_dijkstra() has the same interface but uses heapq, for comparison:
+
+    python shortest_path.py            # times both engines on the large maps
+
+Costs are charged on entering a cell. Both engines return distances in
+scaled units; use unscale() to get exact costs in the original units.
+"""
+
+import heapq
+import sys
+import time
+from array import array
+from fractions import Fraction
+from math import lcm
+
+from grid import load, record_stats
+
+UNREACHED = 1 << 62
+
+
+def scaled_costs(cost_map):
+    """Convert a {char: cost} map to fixed-point integer costs.
+
+    Returns:
+        (table, scale): a 256-entry list where table[code] is the cost of
+        that cell multiplied by `scale` (an exact integer) or None if the
+        cell is impassable, and the smallest scale that makes every cost
+        integral
+    """
+    fractions = {ch: Fraction(cost).limit_denominator(1 << 16) for ch, cost in cost_map.items()}
+    scale = lcm(*(f.denominator for f in fractions.values())) if fractions else 1
+    table = [None] * 256
+    for ch, cost in fractions.items():
+        table[ord(ch)] = int(cost * scale)
+    return table, scale
+
+
+def unscale(d, scale):
+    """Convert a scaled distance back to original units (an int when exact)."""
+    if scale == 1:
+        return d
+    return d / scale if d % scale else d // scale
+
+
+def dial(grid, sources, costs, offsets, goals=None, reverse=False, stats=None, target=None):
+    """Multi-source Dijkstra with a circular bucket queue.
+
+    Args:
+        grid: Grid
+        sources: flat indices seeded at distance 0
+        costs: integer cost table from scaled_costs (None = impassable)
+        offsets: neighbor deltas, e.g. grid.offsets4 or grid.offsets8
+        goals: optional 256-entry table; the search stops at the first popped
+               cell whose code is marked in it
+        reverse: measure distances *to* the sources instead of from them
+                 (stepping from u into v still costs costs[v])
+        stats: optional dict; receives 'expanded' and 'peak_frontier' counts
+        target: optional flat index; the search also stops when it is popped
+
+    Returns:
+        (dist, parent, goal): dist and parent are per-cell arrays (UNREACHED
+        and -1 for unreached cells; a source is its own parent), goal is the
+        flat index of the goal reached or None
+    """
+    cells = grid.cells
+    dist = array('q', [UNREACHED]) * grid.size
+    parent = array('i', [-1]) * grid.size
+    width = max(c for c in costs if c is not None) + 1
+    buckets = [[] for _ in range(width)]
+    for s in sources:
+        dist[s] = 0
+        parent[s] = s
+        buckets[0].append(s)
+
+    pending = len(sources)
+    expanded = peak = 0
+    d = 0
+    while pending:
+        if pending > peak:
+            peak = pending
+        bucket = buckets[d % width]
+        while bucket:
+            i = bucket.pop()
+            pending -= 1
+            if dist[i] != d:
+                continue
+            expanded += 1
+            if i == target or (goals is not None and goals[cells[i]]):
+                record_stats(stats, expanded, peak)
+                return dist, parent, i
+            step = costs[cells[i]]
+            for o in offsets:
+                n = i + o
+                cost = costs[cells[n]]
+                if cost is None:
+                    continue
+                nd = d + (step if reverse else cost)
+                if nd < dist[n]:
+                    dist[n] = nd
+                    parent[n] = i
+                    buckets[nd % width].append(n)
+                    pending += 1
+        d += 1
+    record_stats(stats, expanded, peak)
+    return dist, parent, None
+
+
+def heap_dijkstra(grid, sources, costs, offsets, goals=None, reverse=False, stats=None,
+                  target=None):
+    """Same contract as dial(), using a binary heap (heapq)."""
+    cells = grid.cells
+    dist = array('q', [UNREACHED]) * grid.size
+    parent = array('i', [-1]) * grid.size
+    heap = []
+    for s in sources:
+        dist[s] = 0
+        parent[s] = s
+        heap.append((0, s))
+    heapq.heapify(heap)
+
+    expanded = peak = 0
+    while heap:
+        if len(heap) > peak:
+            peak = len(heap)
+        d, i = heapq.heappop(heap)
+        if d != dist[i]:
+            continue
+        expanded += 1
+        if i == target or (goals is not None and goals[cells[i]]):
+            record_stats(stats, expanded, peak)
+            return dist, parent, i
+        step = costs[cells[i]]
+        for o in offsets:
+            n = i + o
+            cost = costs[cells[n]]
+            if cost is None:
+                continue
+            nd = d + (step if reverse else cost)
+            if nd < dist[n]:
+                dist[n] = nd
+                parent[n] = i
+                heapq.heappush(heap, (nd, n))
+    record_stats(stats, expanded, peak)
+    return dist, parent, None
+
+
+ENGINES = {
+    'dial': dial,
+    'heap': heap_dijkstra,
+}
+
+
+def main():
+    import problem2
+    import problem6
+    import problem7
+
+    solvers = [
+        ('problem2_large.txt', problem2.find_cheapest_path),
+        ('problem6_large.txt', problem6.find_lowest_power_path),
+        ('problem7_large.txt', problem7.find_nearest_shelter),
+    ]
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for filename, solve in solvers:
+        grid = load(filename)
+        row = [filename]
+        costs = set()
+        for engine in ENGINES:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                result = solve(grid, engine=engine)
+            elapsed = (time.perf_counter() - start) / repeats
+            costs.add(None if result is None else result[0])
+            row.append(f"{engine} {elapsed * 1000:8.2f} ms")
+        row.append('costs agree' if len(costs) == 1 else f'COSTS DIFFER {costs}')
+        print('  '.join(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import random
+from collections import deque
+
+import problem1
+from grid import Grid
+
+
+def reference_steps(rows, start=None):
+    """Fewest steps to an 'E' by a plain BFS over lists, or None."""
+    n, m = len(rows), len(rows[0])
+    fires = [(r, c) for r in range(n) for c in range(m) if rows[r][c] == 'x']
+    blocked = {(r, c) for r in range(n) for c in range(m)
+               if any(abs(r - fr) + abs(c - fc) <= problem1.FIRE_RADIUS for fr, fc in fires)}
+    if start is None:
+        start = next((r, c) for r in range(n) for c in range(m) if rows[r][c] == 'S')
+    steps = {start: 0}
+    queue = deque([start])
+    while queue:
+        r, c = queue.popleft()
+        if rows[r][c] == 'E':
+            return steps[r, c]
+        for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+            if (0 <= nr < n and 0 <= nc < m and (nr, nc) not in steps
+                    and rows[nr][nc] in '.SE' and (nr, nc) not in blocked):
+                steps[nr, nc] = steps[r, c] + 1
+                queue.append((nr, nc))
+    return None
+
+
+def random_building(rng):
+    n, m = rng.randint(1, 12), rng.randint(2, 12)
+    rows = [[rng.choice('......#|_') for _ in range(m)] for _ in range(n)]
+    cells = [(r, c) for r in range(n) for c in range(m)]
+    picks = rng.sample(cells, min(len(cells), rng.randint(2, 5)))
+    for k, (r, c) in enumerate(picks):
+        rows[r][c] = 'S' if k == 0 else rng.choice('EEx')
+    return rows
+
+
+def check_path(rows, steps, path, start=None):
+    assert len(path) == steps + 1
+    if start is not None:
+        assert path[0] == start
+    else:
+        assert rows[path[0][0]][path[0][1]] == 'S'
+    assert rows[path[-1][0]][path[-1][1]] == 'E'
+    for (r0, c0), (r1, c1) in zip(path, path[1:]):
+        assert abs(r1 - r0) + abs(c1 - c0) == 1
+        assert rows[r1][c1] in '.SE'
+
+
+def test_engines_match_reference_bfs():
+    rng = random.Random(1)
+    for _ in range(300):
+        rows = random_building(rng)
+        want = reference_steps(rows)
+        grid = Grid.from_lines(rows)
+        for engine in ('bfs', 'bitset', 'corridor', 'auto'):
+            result = problem1.find_escape_path(grid, engine=engine)
+            assert (result and result[0]) == want
+            if result:
+                check_path(rows, *result)
+
+
+def test_session_replans_match_fresh_bfs():
+    rng = random.Random(2)
+    for _ in range(60):
+        rows = random_building(rng)
+        session = problem1.EvacuationSession(Grid.from_lines(rows))
+        for _ in range(12):
+            start = session.grid.position(session.start)
+            r, c = rng.randrange(len(rows)), rng.randrange(len(rows[0]))
+            if (r, c) != start:
+                rng.choice([session.add_fire, session.add_wall, session.clear_cell])(r, c)
+            current = session.grid.to_lists()
+            result = session.plan()
+            assert (result and result[0]) == reference_steps(current, start)
+            if result:
+                check_path(current, *result, start=start)
+                # never step onto an exit, so the start stays a plain cell
+                if result[0] > 1 and rng.random() < 0.5:
+                    session.move_to(*result[1][1])
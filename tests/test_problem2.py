@@ -0,0 +1,53 @@
+import random
+
+import problem2
+from grid import Grid
+
+
+def random_floor(rng):
+    n, m = rng.randint(1, 10), rng.randint(2, 10)
+    rows = [[rng.choice('....**~~#') for _ in range(m)] for _ in range(n)]
+    cells = [(r, c) for r in range(n) for c in range(m)]
+    picks = rng.sample(cells, min(len(cells), rng.randint(3, 5)))
+    for k, (r, c) in enumerate(picks):
+        rows[r][c] = 'SC'[k] if k < 2 else 'D'
+    return rows
+
+
+def check_path(rows, total, path):
+    assert rows[path[0][0]][path[0][1]] == 'S'
+    assert rows[path[-1][0]][path[-1][1]] == 'C'
+    assert any(rows[r][c] == 'D' for r, c in path)
+    cost = 0
+    for (r0, c0), (r1, c1) in zip(path, path[1:]):
+        assert max(abs(r1 - r0), abs(c1 - c0)) == 1
+        cost += problem2.get_cell_cost(rows[r1][c1])
+    assert cost == total
+
+
+def test_engines_match_dial():
+    rng = random.Random(5)
+    for _ in range(200):
+        rows = random_floor(rng)
+        grid = Grid.from_lines(rows)
+        want = problem2.find_cheapest_path(grid)
+        hierarchy = problem2.hierarchy_for(grid)
+        for result in (problem2.find_cheapest_path(grid, engine='heap'),
+                       problem2.find_cheapest_path(grid, engine='layered'),
+                       problem2.find_cheapest_path(grid, hierarchy=hierarchy)):
+            assert (result and result[0]) == (want and want[0])
+            if result:
+                check_path(rows, *result)
+
+
+def test_hierarchy_file_round_trip(tmp_path):
+    rng = random.Random(6)
+    rows = random_floor(rng)
+    filename = str(tmp_path / 'floor.txt')
+    built = problem2.hierarchy_for(Grid.from_lines(rows), filename)
+    loaded = problem2.ContractionHierarchy.load(problem2.hierarchy_path(filename),
+                                                Grid.from_lines(rows))
+    assert loaded is not None
+    grid = Grid.from_lines(rows)
+    assert (problem2.find_cheapest_path(grid, hierarchy=loaded)
+            == problem2.find_cheapest_path(grid, hierarchy=built))
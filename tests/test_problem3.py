@@ -0,0 +1,98 @@
+import random
+
+import problem3
+from grid import Grid
+
+MOVES = [(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+def reference_steps(rows, guards):
+    """Fewest steps from 'S' to 'T' by replaying get_guard_position, or None."""
+    n, m = len(rows), len(rows[0])
+    start = next((r, c) for r in range(n) for c in range(m) if rows[r][c] == 'S')
+    frontier = {start}
+    for t in range(n * m * 2):
+        guard_cells = {problem3.get_guard_position(g, t + 1) for g in guards}
+        frontier = {(r + dr, c + dc) for r, c in frontier for dr, dc in MOVES
+                    if 0 <= r + dr < n and 0 <= c + dc < m and rows[r + dr][c + dc] in '.ST'
+                    and (r + dr, c + dc) not in guard_cells}
+        if any(rows[r][c] == 'T' for r, c in frontier):
+            return t + 1
+        if not frontier:
+            return None
+    return None
+
+
+def random_museum(rng):
+    n, m = rng.randint(1, 8), rng.randint(2, 8)
+    rows = [[rng.choice('....#') for _ in range(m)] for _ in range(n)]
+    cells = [(r, c) for r in range(n) for c in range(m)]
+    (sr, sc), (tr, tc) = rng.sample(cells, 2)
+    rows[sr][sc] = 'S'
+    rows[tr][tc] = 'T'
+    guards = []
+    for k in range(rng.randint(0, 4)):
+        r, c = rng.choice(cells)
+        moves = [rng.choice('RLUD') for _ in range(rng.randint(0, 5))]
+        if rng.random() < 0.6:
+            moves += [{'R': 'L', 'L': 'R', 'U': 'D', 'D': 'U'}[x] for x in reversed(moves)]
+        guards.append(problem3.build_guard(f'G{k}', (r, c), moves))
+    return rows, guards
+
+
+def check_path(rows, guards, result):
+    steps, path = result
+    assert len(path) == steps + 1
+    assert rows[path[0][0]][path[0][1]] == 'S'
+    assert rows[path[-1][0]][path[-1][1]] == 'T'
+    for t, ((r0, c0), (r1, c1)) in enumerate(zip(path, path[1:]), 1):
+        assert abs(r1 - r0) + abs(c1 - c0) <= 1
+        assert rows[r1][c1] in '.ST'
+        assert all(problem3.get_guard_position(g, t) != (r1, c1) for g in guards)
+
+
+def test_drifting_guard_leaves_the_grid():
+    grid = Grid.from_lines(['S..', '...', '..T'])
+    guard = problem3.build_guard('G1', (0, 2), ['R'])
+    timetable = problem3.GuardTimetable(grid, [guard])
+    for t in range(8):
+        r, c = problem3.get_guard_position(guard, t)
+        inside = 0 <= r < grid.rows and 0 <= c < grid.cols
+        assert timetable.positions(t) == ([grid.index(r, c)] if inside else [])
+        for i in range(grid.size):
+            assert timetable.occupied(i, t) == (inside and i == grid.index(r, c))
+
+
+def test_drifting_guard_does_not_wrap_onto_the_next_row():
+    # off the left edge of row 1 the guard used to land on row 0
+    rows = ['#T', '..', 'S#']
+    guard = problem3.build_guard('G1', (1, 1), ['L'])
+    assert reference_steps(rows, [guard]) == 4
+    for engine in ('bfs', 'bitset'):
+        assert problem3.find_safe_path(Grid.from_lines(rows), [guard], engine=engine)[0] == 4
+
+
+def test_engines_match_guard_replay():
+    rng = random.Random(3)
+    for _ in range(300):
+        rows, guards = random_museum(rng)
+        want = reference_steps(rows, guards)
+        grid = Grid.from_lines(rows)
+        for engine in ('bfs', 'bitset'):
+            result = problem3.find_safe_path(grid, guards, engine=engine)
+            assert (result and result[0]) == want
+            if result:
+                check_path(rows, guards, result)
+
+
+def test_unfolded_timetable_and_sparse_states_match():
+    rng = random.Random(4)
+    for _ in range(100):
+        rows, guards = random_museum(rng)
+        grid = Grid.from_lines(rows)
+        want = problem3.find_safe_path(grid, guards)
+        sparse = problem3.find_safe_path(grid, guards, max_dense_states=0)
+        timetable = problem3.GuardTimetable(grid, guards, max_reservations=0)
+        unfolded = problem3.find_safe_path(grid, guards, timetable)
+        assert (sparse and sparse[0]) == (want and want[0])
+        assert (unfolded and unfolded[0]) == (want and want[0])
@@ -0,0 +1,67 @@
+import heapq
+import random
+
+import problem4
+from grid import Grid
+
+
+def reference_cost(rows):
+    """Least effort from 'S' to 'H' by a plain Dijkstra over lists, or None."""
+    n, m = len(rows), len(rows[0])
+    start = next((r, c) for r in range(n) for c in range(m) if rows[r][c] == 'S')
+    best = {start: 0}
+    heap = [(0, start)]
+    while heap:
+        d, (r, c) = heapq.heappop(heap)
+        if d > best[r, c]:
+            continue
+        if rows[r][c] == 'H':
+            return d
+        here = problem4.get_altitude(rows[r][c])
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                nr, nc = r + dr, c + dc
+                if (dr or dc) and 0 <= nr < n and 0 <= nc < m:
+                    there = problem4.get_altitude(rows[nr][nc])
+                    if there is not None:
+                        nd = d + problem4.movement_cost(here, there)
+                        if nd < best.get((nr, nc), nd + 1):
+                            best[nr, nc] = nd
+                            heapq.heappush(heap, (nd, (nr, nc)))
+    return None
+
+
+def random_terrain(rng):
+    n, m = rng.randint(1, 10), rng.randint(2, 10)
+    rows = [[rng.choice('0123456789###') for _ in range(m)] for _ in range(n)]
+    cells = [(r, c) for r in range(n) for c in range(m)]
+    (sr, sc), (hr, hc) = rng.sample(cells, 2)
+    rows[sr][sc] = 'S'
+    rows[hr][hc] = 'H'
+    return rows
+
+
+def test_landmark_search_matches_dijkstra():
+    rng = random.Random(9)
+    for _ in range(200):
+        rows = random_terrain(rng)
+        want = reference_cost(rows)
+        grid = Grid.from_lines(rows)
+        landmarks = problem4.Landmarks.build(grid, count=rng.randint(1, 4))
+        for result in (problem4.find_rescue_path(grid),
+                       problem4.find_rescue_path(grid, landmarks=landmarks)):
+            assert (result and result[0]) == want
+
+
+def test_landmarks_for_rebuilds_only_short_tables(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'terrain.txt')
+    grid = Grid.from_lines(['S1#', '##H'])
+    assert len(problem4.landmarks_for(grid, filename, count=1).indices) == 1
+    assert len(problem4.landmarks_for(grid, filename, count=8).indices) == 3
+
+    def build(*args, **kwargs):
+        raise AssertionError('tables rebuilt')
+
+    # three passable cells: the stored tables are as complete as they get
+    monkeypatch.setattr(problem4.Landmarks, 'build', build)
+    assert len(problem4.landmarks_for(grid, filename, count=8).indices) == 3
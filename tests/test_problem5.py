@@ -0,0 +1,90 @@
+import heapq
+import random
+
+import problem5
+from grid import Grid
+
+
+def rides(rows, r, c, dr, dc):
+    """(rest, cells entered, resists) for each way a move from (r, c) can end,
+    following the currents cell by cell."""
+    n, m = len(rows), len(rows[0])
+    entered = 0
+    seen = set()
+    while True:
+        r, c = r + dr, c + dc
+        entered += 1
+        if not (0 <= r < n and 0 <= c < m) or rows[r][c] == '#' or (r, c) in seen:
+            return
+        direction = problem5.get_current_direction(rows[r][c])
+        if direction is None:
+            yield (r, c), entered, 0
+            return
+        seen.add((r, c))
+        yield (r, c), entered, 1
+        dr, dc = direction
+
+
+def reference_costs(rows, battery):
+    """Dijkstra over (cell, battery used) states: the fewest cells entered
+    to reach 'U' with each battery use, as a dict."""
+    n, m = len(rows), len(rows[0])
+    start = next((r, c) for r in range(n) for c in range(m) if rows[r][c] == 'S')
+    best = {(start, 0): 0}
+    heap = [(0, start, 0)]
+    found = {}
+    while heap:
+        d, cell, used = heapq.heappop(heap)
+        if best[cell, used] != d:
+            continue
+        r, c = cell
+        if rows[r][c] == 'U':
+            found.setdefault(used, d)
+            continue
+        for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            for rest, entered, resists in rides(rows, r, c, dr, dc):
+                state = (rest, used + resists)
+                if used + resists <= battery and d + entered < best.get(state, d + entered + 1):
+                    best[state] = d + entered
+                    heapq.heappush(heap, (d + entered, rest, used + resists))
+    return found
+
+
+def random_cave(rng):
+    n, m = rng.randint(1, 7), rng.randint(2, 7)
+    rows = [[rng.choice('....#><^v') for _ in range(m)] for _ in range(n)]
+    cells = [(r, c) for r in range(n) for c in range(m)]
+    (sr, sc), (ur, uc) = rng.sample(cells, 2)
+    rows[sr][sc] = 'S'
+    rows[ur][uc] = 'U'
+    return rows, rng.randint(0, 3)
+
+
+def check_path(rows, battery, path, used):
+    assert rows[path[0][0]][path[0][1]] == 'S'
+    assert rows[path[-1][0]][path[-1][1]] == 'U'
+    resists = 0
+    for (r0, c0), (r1, c1) in zip(path, path[1:]):
+        assert abs(r1 - r0) + abs(c1 - c0) == 1
+        assert rows[r1][c1] != '#'
+        if problem5.get_current_direction(rows[r0][c0]) not in (None, (r1 - r0, c1 - c0)):
+            resists += 1
+    assert resists <= used <= battery
+
+
+def test_engines_match_exhaustive_search():
+    rng = random.Random(7)
+    for _ in range(400):
+        rows, battery = random_cave(rng)
+        found = reference_costs(rows, battery)
+        grid = Grid.from_lines(rows)
+        for engine in ('bfs', 'ida', 'min_battery'):
+            result = problem5.find_escape_path(grid, battery, engine=engine)
+            assert (result is None) == (not found)
+            if result:
+                check_path(rows, battery, *result)
+        if found:
+            path, _ = problem5.find_escape_path(grid, battery, engine='ida')
+            assert len(path) - 1 == min(found.values())
+            path, used = problem5.find_escape_path(grid, battery, engine='min_battery')
+            assert (used, len(path) - 1) == min(found.items())
@@ -0,0 +1,58 @@
+import os
+import random
+
+import problem6
+from grid import Grid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def random_floorplan(rng):
+    n, m = rng.randint(2, 40), rng.randint(2, 40)
+    rows = [[rng.choice('...CMP##') for _ in range(m)] for _ in range(n)]
+    cells = [(r, c) for r in range(n) for c in range(m)]
+    rng.shuffle(cells)
+    r, c = cells.pop()
+    rows[r][c] = 'S'
+    for _ in range(rng.randint(1, 3)):
+        r, c = cells.pop()
+        rows[r][c] = 'O'
+    return Grid.from_lines(rows)
+
+
+def test_hpa_cost_is_bracketed_by_its_lower_bound():
+    rng = random.Random(4)
+    for _ in range(150):
+        grid = random_floorplan(rng)
+        exact = problem6.find_lowest_power_path(grid)
+        stats = {}
+        approx = problem6.find_lowest_power_path(grid, engine='hpa', stats=stats)
+        assert (exact is None) == (approx is None)
+        if exact:
+            cost, path, bound = approx
+            assert bound == stats['lower_bound']
+            assert bound <= exact[0] <= cost
+            assert path[0] == grid.find('S')[0]
+
+
+def test_hpa_cache_survives_pin_moves():
+    rows = [list(line.rstrip('\n')) for line in open(os.path.join(ROOT, 'problem6_large.txt'))]
+    for r, row in enumerate(rows):
+        for c, ch in enumerate(row):
+            if ch in 'SO':
+                row[c] = '.'
+    free = [(r, c) for r, row in enumerate(rows) for c, ch in enumerate(row) if ch == '.']
+    rng = random.Random(1)
+    graphs = set()
+    for _ in range(5):
+        moved = [row[:] for row in rows]
+        (sr, sc), (tr, tc) = rng.sample(free, 2)
+        moved[sr][sc], moved[tr][tc] = 'S', 'O'
+        grid = Grid.from_lines(moved)
+        graphs.add(id(problem6.cluster_graph(grid)))
+        exact = problem6.find_lowest_power_path(grid)
+        approx = problem6.find_lowest_power_path(grid, engine='hpa')
+        if exact:
+            assert approx[1][0] == (sr, sc) and approx[1][-1] == (tr, tc)
+            assert approx[2] <= exact[0] <= approx[0]
+    assert len(graphs) == 1
@@ -0,0 +1,41 @@
+import random
+
+import problem7
+from grid import Grid
+
+
+def random_trail(rng):
+    n, m = rng.randint(1, 10), rng.randint(2, 10)
+    rows = [[rng.choice('....FF#') for _ in range(m)] for _ in range(n)]
+    for _ in range(rng.randint(0, 3)):
+        rows[rng.randrange(n)][rng.randrange(m)] = 'H'
+    return rows
+
+
+def test_batch_field_matches_single_queries():
+    rng = random.Random(8)
+    for _ in range(100):
+        rows = random_trail(rng)
+        grid = Grid.from_lines(rows)
+        starts = [(r, c) for r in range(len(rows)) for c in range(len(rows[0]))]
+        results = problem7.find_nearest_shelters(grid, starts + [(-1, 0), (0, len(rows[0]))])
+        assert results[-2:] == [None, None]
+        for (r, c), result in zip(starts, results):
+            if rows[r][c] == '#':
+                assert result is None
+                continue
+            if rows[r][c] == 'H':
+                assert result == (0, [(r, c)])
+                continue
+            single = [row[:] for row in rows]
+            single[r][c] = 'S'
+            want = problem7.find_nearest_shelter(Grid.from_lines(single), engine='heap')
+            assert (result and result[0]) == (want and want[0])
+            if result:
+                path = result[1]
+                assert path[0] == (r, c) and rows[path[-1][0]][path[-1][1]] == 'H'
+                cost = 0
+                for (r0, c0), (r1, c1) in zip(path, path[1:]):
+                    assert abs(r1 - r0) + abs(c1 - c0) == 1
+                    cost += problem7.get_cell_cost(rows[r1][c1])
+                assert cost == result[0]